@@ -0,0 +1,129 @@
+from asgiref.sync import sync_to_async
+from django.http import Http404, JsonResponse
+from core.analytics import get_analytics_writer, get_session_id
+from core.models import Paper, Recommendation
+from .serializers import PaperSerializer, RecommendationSerializer
+from recommendation.batching import get_query_coalescer
+from recommendation.embedding_cache import normalize_query
+from recommendation.result_cache import get_result_cache
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Async counterparts of the search and recommendation endpoints. Served under
+# ASGI, concurrent requests share micro-batched encoder calls through the
+# query coalescer instead of each running a single-text encode.
+
+MODEL_NAME = "allenai-specter"
+
+
+def _parse_top_k(request, default=10, maximum=100):
+    """Read the number of results to return from the `k` query parameter."""
+    try:
+        top_k = int(request.GET.get('k', default))
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(top_k, maximum))
+
+
+def _serialize_papers(coalescer, paper_ids):
+    """Serialize papers in the given order with the coalescer's recommendation service."""
+    papers = coalescer.service.get_papers_in_order(paper_ids)
+    return PaperSerializer(papers, many=True).data
+
+
+def _get_paper_and_log_view(request, pk):
+    """Fetch the paper and record the view."""
+    try:
+        paper = Paper.objects.get(id=pk)
+    except Paper.DoesNotExist:
+        raise Http404(f"Paper {pk} not found")
+
+    get_analytics_writer().record_view(
+        paper=paper,
+        session_id=get_session_id(request),
+        ip_address=request.META.get('REMOTE_ADDR')
+    )
+    return paper
+
+
+def _log_search(request, query, filters, result_count):
+    """Record the search."""
+    get_analytics_writer().record_search(
+        query=query,
+        filters=filters,
+        result_count=result_count,
+        session_id=get_session_id(request),
+        user=request.user
+    )
+
+
+def _get_stored_recommendations(paper):
+    """Serialize existing recommendations for a paper, or return None if there are none."""
+    recommendations = Recommendation.objects.filter(source_paper=paper).select_related('recommended_paper')
+    if not recommendations.exists():
+        return None
+    return RecommendationSerializer(recommendations, many=True).data
+
+
+def _store_and_serialize_recommendations(coalescer, paper, rows):
+    """Persist freshly computed recommendations with the coalescer's service and serialize them."""
+    recommendations = coalescer.service.store_recommendations(paper, rows)
+    return RecommendationSerializer(recommendations, many=True).data
+
+
+async def search(request):
+    """Search for papers based on a query."""
+    query = request.GET.get('q', '')
+    if not query:
+        return JsonResponse({"error": "Query parameter 'q' is required"}, status=400)
+
+    top_k = _parse_top_k(request)
+    filters = {}
+    category = request.GET.get('category')
+    if category:
+        filters['category'] = category
+
+    result_cache = get_result_cache()
+    cache_params = {'q': normalize_query(query), 'k': top_k, 'filters': filters}
+    data = await sync_to_async(result_cache.get)('search', MODEL_NAME, **cache_params)
+    if data is None:
+        coalescer = get_query_coalescer(MODEL_NAME)
+        try:
+            rows = await coalescer.search(query, top_k=top_k, filters=filters)
+        except Exception as e:
+            logger.error(f"Error searching papers: {str(e)}")
+            rows = []
+
+        data = await sync_to_async(_serialize_papers)(coalescer, [paper_id for paper_id, _ in rows])
+        if data:
+            await sync_to_async(result_cache.set)('search', MODEL_NAME, data, **cache_params)
+
+    await sync_to_async(_log_search)(request, query, filters, len(data))
+    return JsonResponse(data, safe=False)
+
+
+async def recommendations(request, pk):
+    """Get recommendations for a paper."""
+    paper = await sync_to_async(_get_paper_and_log_view)(request, pk)
+
+    result_cache = get_result_cache()
+    data = await sync_to_async(result_cache.get)('recommendations', MODEL_NAME, paper_id=paper.id)
+    if data is not None:
+        return JsonResponse(data, safe=False)
+
+    data = await sync_to_async(_get_stored_recommendations)(paper)
+    if data is None:
+        coalescer = get_query_coalescer(MODEL_NAME)
+        try:
+            rows = await coalescer.search(
+                paper.abstract, top_k=10, is_query=False, exclude_id=str(paper.id)
+            )
+        except Exception as e:
+            logger.error(f"Error getting similar papers: {str(e)}")
+            rows = []
+        data = await sync_to_async(_store_and_serialize_recommendations)(coalescer, paper, rows)
+
+    if data:
+        await sync_to_async(result_cache.set)('recommendations', MODEL_NAME, data, paper_id=paper.id)
+    return JsonResponse(data, safe=False)
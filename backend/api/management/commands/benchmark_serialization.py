@@ -0,0 +1,56 @@
+import time
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from core.models import Paper, Recommendation
+from api.renderers import FastJSONRenderer
+from api.serializers import PaperSerializer, RecommendationSerializer
+
+
+class Command(BaseCommand):
+    help = 'Benchmark rows/sec for the paper and recommendation read paths'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help='Number of rows to serialize per run')
+        parser.add_argument('--repeat', type=int, default=3, help='Number of runs to average over')
+        parser.add_argument('--fields', type=str, default='id,title,authors,categories,update_date',
+                            help='Sparse fieldset to compare against the full paper serializer')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        repeat = options['repeat']
+        request = Request(APIRequestFactory().get('/', {'fields': options['fields']}))
+        requested = [field for field in options['fields'].split(',') if field]
+
+        cases = [
+            ('papers: full', lambda: PaperSerializer(
+                Paper.objects.order_by('-update_date')[:rows], many=True).data),
+            ('papers: sparse fields', lambda: PaperSerializer(
+                Paper.objects.order_by('-update_date').only('id', *requested)[:rows],
+                many=True, context={'request': request}).data),
+            ('recommendations: no select_related', lambda: RecommendationSerializer(
+                Recommendation.objects.order_by('-recommendation_date')[:rows], many=True).data),
+            ('recommendations: select_related', lambda: RecommendationSerializer(
+                Recommendation.objects.select_related('recommended_paper')
+                .order_by('-recommendation_date')[:rows], many=True).data),
+        ]
+
+        for name, run in cases:
+            self._report(name, run, repeat)
+
+        data = PaperSerializer(Paper.objects.order_by('-update_date')[:rows], many=True).data
+        for name, renderer in (('render: DRF JSON', JSONRenderer()), ('render: fast JSON', FastJSONRenderer())):
+            self._report(name, lambda: renderer.render(data) and data, repeat)
+
+    def _report(self, name, run, repeat):
+        """Time `run` and print the average rows/sec it achieved."""
+        elapsed = 0.0
+        count = 0
+        for _ in range(repeat):
+            start = time.perf_counter()
+            count = len(run())
+            elapsed += time.perf_counter() - start
+
+        rate = count * repeat / elapsed if elapsed and count else 0.0
+        self.stdout.write(f'{name:<40} {count:>7} rows  {rate:>12,.0f} rows/sec')
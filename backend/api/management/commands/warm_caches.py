@@ -0,0 +1,45 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from api.warming import CacheWarmer
+
+
+class Command(BaseCommand):
+    help = 'Precompute recommendations and search results for the most viewed papers and most frequent queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--papers', type=int, default=settings.CACHE_WARMING_PAPERS,
+                            help='Number of most viewed papers to warm')
+        parser.add_argument('--queries', type=int, default=settings.CACHE_WARMING_QUERIES,
+                            help='Number of most frequent search queries to warm')
+        parser.add_argument('--window-hours', type=int, default=settings.CACHE_WARMING_WINDOW_HOURS,
+                            help='Only count views and searches from the last N hours')
+        parser.add_argument('--top-k', type=int, default=10, help='Number of results per recommendation list or search')
+        parser.add_argument('--batch-size', type=int, default=32, help='Number of papers or queries encoded per batch')
+        parser.add_argument('--refresh', action='store_true',
+                            help='Recompute stored recommendations, e.g. after the vector table was rebuilt')
+        parser.add_argument('--loop', action='store_true', help='Keep warming every --interval seconds')
+        parser.add_argument('--interval', type=int, default=900, help='Seconds between runs with --loop')
+
+    def handle(self, *args, **options):
+        warmer = CacheWarmer(
+            paper_count=options['papers'],
+            query_count=options['queries'],
+            window_hours=options['window_hours'],
+            top_k=options['top_k'],
+            batch_size=options['batch_size'],
+        )
+        if 'locmem' in settings.CACHES[settings.RESULT_CACHE_BACKEND]['BACKEND'].lower():
+            self.stdout.write(self.style.WARNING(
+                'The result cache is process-local, so only the Recommendation table is shared with the '
+                'API workers; set CACHE_WARMING_ON_STARTUP to warm their caches in-process'
+            ))
+
+        while True:
+            warmed = warmer.run(refresh=options['refresh'])
+            self.stdout.write(self.style.SUCCESS(
+                f"Warmed {warmed['recommendations']} recommendation lists and {warmed['searches']} search results"
+            ))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
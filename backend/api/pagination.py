@@ -0,0 +1,149 @@
+import base64
+import json
+from collections import OrderedDict
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param, remove_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination on an indexed column with the primary key as a tiebreak.
+
+    Each page is fetched with `WHERE (column, pk) < (last column, last pk)`
+    instead of an OFFSET, and no COUNT(*) is issued, so deep pages cost the
+    same as the first one. Requests that still pass `?page=` get the legacy
+    page-number pagination. Subclasses set `ordering` to the indexed column
+    followed by the primary key, both in the same direction.
+    """
+
+    ordering = None
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Return one page of results after the requested cursor."""
+        self.request = request
+        if request.query_params.get(PageNumberPagination.page_query_param):
+            self.legacy_paginator = PageNumberPagination()
+            return self.legacy_paginator.paginate_queryset(queryset, request, view)
+        self.legacy_paginator = None
+
+        self.page_size = self.get_page_size(request)
+        self.model = queryset.model
+        self.db = queryset.db
+        queryset = queryset.order_by(*self.ordering)
+
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            queryset = queryset.filter(self.after_cursor_filter(*cursor))
+
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        results = results[:self.page_size]
+        self.last_position = self.get_position(results[-1]) if results else None
+        return results
+
+    def get_paginated_response(self, data):
+        """Wrap a page of serialized results."""
+        if self.legacy_paginator is not None:
+            return self.legacy_paginator.get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        """Read the page size from the query string, capped at `max_page_size`."""
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def get_next_link(self):
+        """Build the URL of the next page, or None on the last page."""
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, PageNumberPagination.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.last_position))
+
+    def get_fields(self):
+        """Return the (field name, descending) pairs of the ordering column and the tiebreak."""
+        return [(name.lstrip('-'), name.startswith('-')) for name in self.ordering]
+
+    def get_position(self, instance):
+        """Return the ordering values of an instance as JSON-friendly strings."""
+        position = []
+        for name, _ in self.get_fields():
+            value = getattr(instance, name)
+            position.append(None if value is None else (value.isoformat() if hasattr(value, 'isoformat') else str(value)))
+        return position
+
+    def encode_cursor(self, position):
+        """Encode a position as an opaque cursor string."""
+        return base64.urlsafe_b64encode(json.dumps(position).encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, request):
+        """Decode the cursor in the query string into typed ordering values."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            fields = self.get_fields()
+            if not isinstance(position, list) or len(position) != len(fields):
+                raise ValueError(position)
+            return [
+                None if value is None else self.model._meta.get_field(name).to_python(value)
+                for (name, _), value in zip(fields, position)
+            ]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def after_cursor_filter(self, value, pk):
+        """Build the filter selecting rows that sort after (value, pk)."""
+        (field, descending), (pk_field, _) = self.get_fields()
+        op = 'lt' if descending else 'gt'
+        same_value = Q(**{f'{field}__isnull': True}) if value is None else Q(**{field: value})
+        after_pk = same_value & Q(**{f'{pk_field}__{op}': pk})
+
+        # Where NULLs sort relative to other values depends on the database
+        nulls_largest = connections[self.db].features.nulls_order_largest
+        nulls_after = nulls_largest != descending
+
+        if value is None:
+            # Rows with a value come after the NULLs only if NULLs sort first
+            return after_pk if nulls_after else after_pk | Q(**{f'{field}__isnull': False})
+
+        after_value = Q(**{f'{field}__{op}': value}) | after_pk
+        return (after_value | Q(**{f'{field}__isnull': True})) if nulls_after else after_value
+
+
+class PaperKeysetPagination(KeysetPagination):
+    """Keyset pagination for papers, newest first."""
+
+    ordering = ('-update_date', '-id')
+
+
+class PaperViewKeysetPagination(KeysetPagination):
+    """Keyset pagination for paper views, newest first."""
+
+    ordering = ('-timestamp', '-id')
@@ -0,0 +1,26 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is an optional speedup
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSON renderer backed by orjson when it is installed.
+
+    Falls back to DRF's encoder when orjson is missing or when the client asks
+    for indented output.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Render `data` into JSON bytes."""
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        return orjson.dumps(data, default=encoders.JSONEncoder().default)
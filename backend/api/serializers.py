@@ -1,7 +1,26 @@
 from rest_framework import serializers
-from core.models import Paper, PaperView, Recommendation
+from core.models import Category, Paper, PaperView, Recommendation, UserPaperInteraction
 
-class PaperSerializer(serializers.ModelSerializer):
+def get_requested_fields(request):
+    """Parse the sparse fieldset requested with `?fields=a,b,c`, or None if not given."""
+    if request is None:
+        return None
+    fields = request.query_params.get('fields')
+    if not fields:
+        return None
+    return [field.strip() for field in fields.split(',') if field.strip()]
+
+class SparseFieldsetsMixin:
+    """Limit serialized fields to those requested with the `fields` query parameter."""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = get_requested_fields(self.context.get('request'))
+        if requested is not None:
+            for field_name in set(self.fields) - set(requested):
+                self.fields.pop(field_name)
+
+class PaperSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     """Serializer for the Paper model."""
     
     class Meta:
@@ -24,4 +43,19 @@ class RecommendationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Recommendation
         fields = ['id', 'source_paper', 'recommended_paper', 'recommended_paper_details',
-                  'similarity_score', 'recommendation_date', 'model_name']
\ No newline at end of file
+                  'similarity_score', 'recommendation_date', 'model_name']
+
+class UserPaperInteractionSerializer(serializers.ModelSerializer):
+    """Serializer for the UserPaperInteraction model."""
+    
+    class Meta:
+        model = UserPaperInteraction
+        fields = ['id', 'paper', 'interaction_type', 'timestamp']
+        read_only_fields = ['id', 'timestamp']
+
+class CategorySerializer(serializers.ModelSerializer):
+    """Serializer for the Category model."""
+    
+    class Meta:
+        model = Category
+        fields = ['name', 'paper_count']
\ No newline at end of file
@@ -1,6 +1,9 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import PaperViewSet, PaperViewViewSet, RecommendationViewSet
+from .views import (CategoryViewSet, PaperViewSet, PaperViewViewSet, RecommendationViewSet,
+                    UserPaperInteractionViewSet)
+from . import async_views
+from rag import async_views as rag_async_views
 from rag.views import RAGViewSet
 
 # Import RAG ViewSet
@@ -9,7 +12,14 @@ router = DefaultRouter()
 router.register(r'papers', PaperViewSet)
 router.register(r'paper-views', PaperViewViewSet)
 router.register(r'recommendations', RecommendationViewSet)
+router.register(r'interactions', UserPaperInteractionViewSet)
+router.register(r'categories', CategoryViewSet)
 router.register(r'rag', RAGViewSet, basename='rag')
 urlpatterns = [
+    path('async/papers/search/', async_views.search, name='async-paper-search'),
+    path('async/papers/<str:pk>/recommendations/', async_views.recommendations,
+         name='async-paper-recommendations'),
+    path('async/rag/explain_recommendation_stream/', rag_async_views.explain_recommendation_stream,
+         name='async-rag-explain-stream'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -1,28 +1,95 @@
-from rest_framework import viewsets, status
+from rest_framework import mixins, permissions, viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.conf import settings
 from django.shortcuts import get_object_or_404
-from core.models import Paper, PaperView, Recommendation
-from .serializers import PaperSerializer, PaperViewSerializer, RecommendationSerializer
+from core.analytics import get_analytics_writer, get_session_id
+from core.categories import filter_by_categories, index_paper_categories, refresh_category_counts
+from core.facets import get_facets, get_result_facets, refresh_facet_counts
+from core.models import Category, Paper, PaperView, Recommendation, UserPaperInteraction
+from core.typeahead import get_title_index
+from .pagination import PaperKeysetPagination, PaperViewKeysetPagination
+from .serializers import (CategorySerializer, PaperSerializer, PaperViewSerializer, RecommendationSerializer,
+                          UserPaperInteractionSerializer, get_requested_fields)
 from recommendation.services import RecommendationService
+from recommendation.coview import get_coview_model
+from recommendation.profiles import UserProfileService
+from recommendation.sessions import SessionRecommendationService
+from recommendation.embedding_cache import get_query_embedding_cache, normalize_query
+from recommendation.result_cache import get_result_cache
 import logging
 
 logger = logging.getLogger(__name__)
 
+def parse_top_k(request, default=10, maximum=100):
+    """Read the number of results to return from the `k` query parameter."""
+    try:
+        top_k = int(request.query_params.get('k', default))
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(top_k, maximum))
+
+def parse_diversification(request, max_pool_size=500):
+    """Read the MMR options (`diversify`, `lambda`, `pool`) from the query parameters.
+    
+    Returns a dict of keyword arguments for the recommendation service, empty
+    when diversification is not requested.
+    """
+    if request.query_params.get('diversify', '').lower() not in ('1', 'true', 'yes'):
+        return {}
+    
+    try:
+        mmr_lambda = float(request.query_params.get('lambda', 0.7))
+        pool_size = int(request.query_params.get('pool', 100))
+    except (TypeError, ValueError):
+        mmr_lambda, pool_size = 0.7, 100
+    
+    return {
+        'mmr_lambda': max(0.0, min(mmr_lambda, 1.0)),
+        'pool_size': max(1, min(pool_size, max_pool_size)),
+    }
+
+def parse_list_param(request, name):
+    """Read a comma-separated list from a query parameter."""
+    value = request.query_params.get(name, '')
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+def parse_blend(request):
+    """Read the co-view blend weight from the `blend` query parameter (0 disables blending)."""
+    try:
+        blend = float(request.query_params.get('blend', 0))
+    except (TypeError, ValueError):
+        return 0.0
+    return max(0.0, min(blend, 1.0))
+
 class PaperViewSet(viewsets.ModelViewSet):
     """ViewSet for the Paper model."""
     
     queryset = Paper.objects.all()
     serializer_class = PaperSerializer
+    pagination_class = PaperKeysetPagination
+    model_name = "allenai-specter"
+    max_batch_size = 100
     
     def get_queryset(self):
         """Filter queryset based on query parameters."""
         queryset = Paper.objects.all().order_by('-update_date')
         
-        # Apply filters if provided
+        # Only load the columns a sparse fieldset asks for (e.g. skip abstracts on list views)
+        requested = get_requested_fields(self.request)
+        if requested is not None:
+            model_fields = {field.name for field in Paper._meta.concrete_fields}
+            queryset = queryset.only('id', 'update_date', *(set(requested) & model_fields))
+        
+        # Apply filters if provided, matching cross-listed papers through the category index
         category = self.request.query_params.get('category')
         if category:
-            queryset = queryset.filter(categories=category)
+            queryset = filter_by_categories(queryset, any_of=[category])
+        
+        categories_any = parse_list_param(self.request, 'categories_any')
+        categories_all = parse_list_param(self.request, 'categories_all')
+        if categories_any or categories_all:
+            queryset = filter_by_categories(queryset, any_of=categories_any, all_of=categories_all)
         
         search = self.request.query_params.get('search')
         if search:
@@ -30,27 +97,67 @@ class PaperViewSet(viewsets.ModelViewSet):
         
         return queryset
     
+    def perform_create(self, serializer):
+        """Save the paper and index its categories."""
+        paper = serializer.save()
+        index_paper_categories([paper])
+    
+    def perform_update(self, serializer):
+        """Save the paper and replace its category links."""
+        paper = serializer.save()
+        index_paper_categories([paper])
+    
+    def perform_destroy(self, instance):
+        """Delete the paper and refresh the counts of the categories it was indexed under."""
+        cells = set(instance.category_links.values_list('category_id', 'month'))
+        instance.delete()
+        refresh_category_counts({category_id for category_id, _ in cells})
+        refresh_facet_counts(cells)
+    
     @action(detail=True, methods=['get'])
     def recommendations(self, request, pk=None):
         """Get recommendations for a paper."""
         paper = get_object_or_404(Paper, id=pk)
         
-        # Create paper view
-        PaperView.objects.create(
+        # Record the paper view (written behind the request)
+        get_analytics_writer().record_view(
             paper=paper,
-            session_id=request.session.session_key or 'anonymous',
+            session_id=get_session_id(request),
             ip_address=request.META.get('REMOTE_ADDR')
         )
         
+        # Serve the serialized list from the result cache when possible
+        diversification = parse_diversification(request)
+        blend = parse_blend(request)
+        result_cache = get_result_cache()
+        cache_params = {'paper_id': paper.id, 'blend': blend, **diversification}
+        data = result_cache.get('recommendations', self.model_name, **cache_params)
+        if data is not None:
+            return Response(data)
+        
         # Get existing recommendations or generate new ones
-        recommendations = Recommendation.objects.filter(source_paper=paper)
-        if not recommendations.exists():
+        recommendations = Recommendation.objects.filter(source_paper=paper).select_related('recommended_paper')
+        if diversification or not recommendations.exists():
             # Generate recommendations
-            recommendation_service = RecommendationService()
-            recommendations = recommendation_service.get_similar_papers(paper.id)
+            recommendation_service = RecommendationService(model_name=self.model_name)
+            recommendations = recommendation_service.get_similar_papers(paper.id, **diversification)
         
-        serializer = RecommendationSerializer(recommendations, many=True)
-        return Response(serializer.data)
+        # Only blend when sessions actually co-viewed this paper; otherwise serve the plain list
+        coview_model = get_coview_model() if blend else None
+        if coview_model is not None and coview_model.has_coviews(paper.id):
+            # Rerank with "viewers also viewed" scores
+            recommendation_service = RecommendationService(model_name=self.model_name)
+            blended = recommendation_service.blend_with_coview(paper, recommendations, coview_model, alpha=blend)
+            data = RecommendationSerializer([r for r, _, _ in blended], many=True).data
+            for item, (_, coview_score, blended_score) in zip(data, blended):
+                item['coview_score'] = coview_score
+                item['blended_score'] = blended_score
+        else:
+            data = RecommendationSerializer(recommendations, many=True).data
+        
+        if data:
+            result_cache.set('recommendations', self.model_name, data, **cache_params)
+        return Response(data)
     
     @action(detail=False, methods=['get'])
     def search(self, request):
@@ -60,21 +167,190 @@ class PaperViewSet(viewsets.ModelViewSet):
             return Response({"error": "Query parameter 'q' is required"}, 
                            status=status.HTTP_400_BAD_REQUEST)
         
-        # Search for papers
-        recommendation_service = RecommendationService()
-        papers = recommendation_service.search_papers(query)
+        top_k = parse_top_k(request)
+        filters = {}
+        category = request.query_params.get('category')
+        if category:
+            filters['category'] = category
+        
+        # Serve the serialized results from the result cache when possible
+        diversification = parse_diversification(request)
+        result_cache = get_result_cache()
+        cache_params = {'q': normalize_query(query), 'k': top_k, 'filters': filters, **diversification}
+        data = result_cache.get('search', self.model_name, **cache_params)
+        if data is None:
+            # Search for papers
+            recommendation_service = RecommendationService(model_name=self.model_name)
+            papers = recommendation_service.search_papers(query, top_k=top_k, filters=filters,
+                                                          **diversification)
+            
+            serializer = PaperSerializer(papers, many=True)
+            data = serializer.data
+            if data:
+                result_cache.set('search', self.model_name, data, **cache_params)
+        
+        # Record the search (written behind the request)
+        get_analytics_writer().record_search(
+            query=query,
+            filters=filters,
+            result_count=len(data),
+            session_id=get_session_id(request),
+            user=request.user
+        )
+        return Response(data)
+    
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        """Suggest paper titles matching the typed prefix, most viewed first."""
+        query = request.query_params.get('q', '')
+        if not query.strip():
+            return Response([])
+        
+        limit = parse_top_k(request, maximum=settings.TYPEAHEAD_MAX_RESULTS)
+        matches = get_title_index().complete(query, limit=limit)
+        return Response([
+            {"id": paper_id, "title": title, "views": views}
+            for paper_id, title, views in matches
+        ])
+    
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """Get category and year facet counts.
+        
+        Counts come from the precomputed facet tables, narrowed by the
+        `category` and `year` parameters. With `q`, they are counted over the
+        top `k` search results instead.
+        """
+        query = request.query_params.get('q', '')
+        category = request.query_params.get('category')
+        year = request.query_params.get('year')
+        if year is not None and not year.isdigit():
+            return Response({"error": "'year' must be a number"}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if not query:
+            return Response(get_facets(category=category, year=int(year) if year else None))
+        
+        top_k = parse_top_k(request, default=100, maximum=500)
+        filters = {'category': category} if category else {}
+        result_cache = get_result_cache()
+        cache_params = {'q': normalize_query(query), 'k': top_k, 'filters': filters, 'year': year}
+        data = result_cache.get('facets', self.model_name, **cache_params)
+        if data is None:
+            recommendation_service = RecommendationService(model_name=self.model_name)
+            papers = recommendation_service.search_papers(query, top_k=top_k, filters=filters)
+            if year:
+                papers = [paper for paper in papers if paper.update_date and paper.update_date.year == int(year)]
+            data = get_result_facets(papers)
+            if papers:
+                result_cache.set('facets', self.model_name, data, **cache_params)
+        return Response(data)
+    
+    @action(detail=False, methods=['post'])
+    def batch_recommendations(self, request):
+        """Get recommendations for several papers in one request."""
+        paper_ids = request.data.get('paper_ids')
+        if not isinstance(paper_ids, list) or not paper_ids:
+            return Response({"error": "'paper_ids' must be a non-empty list"},
+                           status=status.HTTP_400_BAD_REQUEST)
+        if len(paper_ids) > self.max_batch_size:
+            return Response({"error": f"At most {self.max_batch_size} paper ids can be requested at once"},
+                           status=status.HTTP_400_BAD_REQUEST)
+        
+        paper_ids = list(dict.fromkeys(str(pid) for pid in paper_ids))
+        papers = Paper.objects.in_bulk(paper_ids)
+        
+        # Resolve stored recommendations for every paper in one query
+        recommendations = {pid: [] for pid in papers}
+        stored = (Recommendation.objects
+                  .filter(source_paper_id__in=list(papers), model_name=self.model_name)
+                  .select_related('recommended_paper')
+                  .order_by('-similarity_score'))
+        for recommendation in stored:
+            recommendations[str(recommendation.source_paper_id)].append(recommendation)
+        
+        # Compute the misses with a single batched vector search
+        misses = [papers[pid] for pid, rows in recommendations.items() if not rows]
+        if misses:
+            recommendation_service = RecommendationService(model_name=self.model_name)
+            recommendations.update(recommendation_service.get_similar_papers_batch(misses))
+        
+        return Response({
+            "results": {
+                pid: RecommendationSerializer(rows, many=True).data
+                for pid, rows in recommendations.items()
+            },
+            "not_found": [pid for pid in paper_ids if pid not in papers],
+        })
+    
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def personalized(self, request):
+        """Get recommendations from the user's profile vector."""
+        profile_service = UserProfileService(model_name=self.model_name)
+        papers = profile_service.recommend(request.user, top_k=parse_top_k(request))
         
         serializer = PaperSerializer(papers, many=True)
         return Response(serializer.data)
+    
+    @action(detail=False, methods=['get'])
+    def continue_exploring(self, request):
+        """Get fresh recommendations from the papers viewed in the caller's own session."""
+        session_id = get_session_id(request, create=False)
+        if not session_id:
+            return Response({"error": "No session to build recommendations from"},
+                           status=status.HTTP_400_BAD_REQUEST)
+        
+        session_service = SessionRecommendationService(model_name=self.model_name)
+        papers = session_service.recommend(session_id, top_k=parse_top_k(request))
+        
+        serializer = PaperSerializer(papers, many=True)
+        return Response(serializer.data)
+    
+    @action(detail=False, methods=['get'])
+    def cache_stats(self, request):
+        """Report hit-rate metrics for the search caches."""
+        return Response({
+            "query_embeddings": get_query_embedding_cache().stats(),
+            "results": get_result_cache().stats(),
+        })
 
 class PaperViewViewSet(viewsets.ReadOnlyModelViewSet):
     """ViewSet for the PaperView model."""
     
     queryset = PaperView.objects.all().order_by('-timestamp')
     serializer_class = PaperViewSerializer
+    pagination_class = PaperViewKeysetPagination
 
 class RecommendationViewSet(viewsets.ReadOnlyModelViewSet):
     """ViewSet for the Recommendation model."""
     
-    queryset = Recommendation.objects.all().order_by('-recommendation_date')
-    serializer_class = RecommendationSerializer
\ No newline at end of file
+    queryset = Recommendation.objects.select_related('recommended_paper').order_by('-recommendation_date')
+    serializer_class = RecommendationSerializer
+
+class UserPaperInteractionViewSet(mixins.CreateModelMixin, mixins.ListModelMixin, viewsets.GenericViewSet):
+    """ViewSet for the current user's paper interactions."""
+    
+    queryset = UserPaperInteraction.objects.all()
+    serializer_class = UserPaperInteractionSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get_queryset(self):
+        """Only show the requesting user's interactions."""
+        return UserPaperInteraction.objects.filter(user=self.request.user).order_by('-timestamp')
+    
+    def perform_create(self, serializer):
+        """Record the interaction and update the user's profile vector."""
+        profile_service = UserProfileService()
+        serializer.instance = profile_service.record_interaction(
+            user=self.request.user,
+            paper=serializer.validated_data['paper'],
+            interaction_type=serializer.validated_data['interaction_type']
+        )
+
+class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
+    """ViewSet for categories and their paper counts."""
+    
+    queryset = Category.objects.filter(paper_count__gt=0).order_by('-paper_count', 'name')
+    serializer_class = CategorySerializer
+    pagination_class = None
+    lookup_field = 'name'
+    lookup_value_regex = '[^/]+'
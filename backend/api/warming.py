@@ -0,0 +1,168 @@
+import json
+import threading
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Count
+from django.utils import timezone
+from core.models import Paper, PaperView, Recommendation, UserSearch
+from recommendation.embedding_cache import normalize_query
+from recommendation.result_cache import get_result_cache
+from recommendation.services import RecommendationService
+from .serializers import PaperSerializer, RecommendationSerializer
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class CacheWarmer:
+    """Precompute responses for the most requested papers and search queries.
+
+    The hottest papers (by recent PaperView count) get their Recommendation
+    rows computed in batches and their serialized lists stored in the result
+    cache under the same keys the `recommendations` endpoint uses. The hottest
+    queries (by recent UserSearch count) are embedded in one batch per filter
+    set and their serialized results stored under the `search` endpoint keys.
+    """
+
+    def __init__(self, model_name="allenai-specter", paper_count=100, query_count=100, window_hours=24,
+                 top_k=10, batch_size=32):
+        """Initialize the warmer."""
+        self.model_name = model_name
+        self.paper_count = paper_count
+        self.query_count = query_count
+        self.window_hours = window_hours
+        self.top_k = top_k
+        self.batch_size = batch_size
+        self.result_cache = get_result_cache()
+        self._service = None
+
+    @property
+    def service(self):
+        """Return the recommendation service, created on first use."""
+        if self._service is None:
+            self._service = RecommendationService(model_name=self.model_name)
+        return self._service
+
+    def _since(self):
+        """Return the start of the popularity window."""
+        return timezone.now() - timedelta(hours=self.window_hours)
+
+    def hot_paper_ids(self):
+        """Return the most viewed paper ids in the window, most viewed first."""
+        rows = (PaperView.objects
+                .filter(timestamp__gte=self._since())
+                .values('paper_id')
+                .annotate(n=Count('id'))
+                .order_by('-n')[:self.paper_count])
+        return [row['paper_id'] for row in rows]
+
+    def hot_queries(self):
+        """Return the most frequent (query, filters) pairs in the window, most frequent first.
+
+        Queries that only differ in case or whitespace share a cache key, so
+        they are counted together.
+        """
+        counts = {}
+        rows = (UserSearch.objects
+                .filter(timestamp__gte=self._since())
+                .values('query', 'filters')
+                .annotate(n=Count('id')))
+        for row in rows:
+            filters = row['filters'] or {}
+            key = (normalize_query(row['query']), json.dumps(filters, sort_keys=True))
+            query, _, n = counts.get(key, (row['query'], filters, 0))
+            counts[key] = (query, filters, n + row['n'])
+
+        ranked = sorted(counts.values(), key=lambda item: item[2], reverse=True)
+        return [(query, filters) for query, filters, _ in ranked[:self.query_count]]
+
+    def warm_recommendations(self, paper_ids, refresh=False):
+        """Compute missing (or, with `refresh`, all) recommendations and cache the serialized lists."""
+        papers = Paper.objects.in_bulk(paper_ids)
+        if not refresh:
+            stored = set(Recommendation.objects
+                         .filter(source_paper_id__in=list(papers))
+                         .values_list('source_paper_id', flat=True))
+            pending = [paper for pid, paper in papers.items() if pid not in stored]
+        else:
+            pending = list(papers.values())
+
+        for start in range(0, len(pending), self.batch_size):
+            self.service.get_similar_papers_batch(pending[start:start + self.batch_size], top_k=self.top_k)
+
+        # Cache what the endpoint would serve, with one query for every list
+        recommendations = {pid: [] for pid in papers}
+        stored = Recommendation.objects.filter(source_paper_id__in=list(papers)).select_related('recommended_paper')
+        for recommendation in stored:
+            recommendations[recommendation.source_paper_id].append(recommendation)
+
+        warmed = 0
+        for pid, rows in recommendations.items():
+            data = RecommendationSerializer(rows, many=True).data
+            if data:
+                self.result_cache.set('recommendations', self.model_name, data, paper_id=pid, blend=0.0)
+                warmed += 1
+        return warmed
+
+    def warm_searches(self, queries):
+        """Run the given (query, filters) searches in batches and cache the serialized results."""
+        groups = {}
+        for query, filters in queries:
+            groups.setdefault(json.dumps(filters, sort_keys=True), (filters, []))[1].append(query)
+
+        warmed = 0
+        for filters, group in groups.values():
+            for start in range(0, len(group), self.batch_size):
+                batch = group[start:start + self.batch_size]
+                try:
+                    embeddings = self.service.embed_queries(batch)
+                    frames = self.service.search_embeddings(embeddings, top_k=self.top_k, filters=filters)
+                except Exception as e:
+                    logger.error(f"Error warming search results: {str(e)}")
+                    continue
+
+                results = [frame['id'].astype(str).tolist() for frame in frames]
+                papers = Paper.objects.in_bulk({pid for ids in results for pid in ids})
+                for query, ids in zip(batch, results):
+                    data = PaperSerializer([papers[pid] for pid in ids if pid in papers], many=True).data
+                    if data:
+                        self.result_cache.set('search', self.model_name, data,
+                                              q=normalize_query(query), k=self.top_k, filters=filters)
+                        warmed += 1
+        return warmed
+
+    def run(self, refresh=False):
+        """Warm the hottest papers and queries, returning how many responses were cached."""
+        start = time.perf_counter()
+        papers = self.warm_recommendations(self.hot_paper_ids(), refresh=refresh) if self.paper_count else 0
+        searches = self.warm_searches(self.hot_queries()) if self.query_count else 0
+        logger.info(f"Warmed {papers} recommendation lists and {searches} search results "
+                    f"in {time.perf_counter() - start:.2f} s")
+        return {"recommendations": papers, "searches": searches}
+
+
+def _warm_periodically():
+    """Thread target: warm once, then every `CACHE_WARMING_INTERVAL` seconds if set."""
+    warmer = CacheWarmer(
+        paper_count=settings.CACHE_WARMING_PAPERS,
+        query_count=settings.CACHE_WARMING_QUERIES,
+        window_hours=settings.CACHE_WARMING_WINDOW_HOURS,
+    )
+    while True:
+        try:
+            warmer.run()
+        except Exception as e:
+            logger.error(f"Error warming caches: {str(e)}")
+        finally:
+            close_old_connections()
+
+        if settings.CACHE_WARMING_INTERVAL <= 0:
+            return
+        time.sleep(settings.CACHE_WARMING_INTERVAL)
+
+
+def start_cache_warming():
+    """Warm this process's caches in a background thread, e.g. when a worker starts."""
+    threading.Thread(target=_warm_periodically, name="cache-warming", daemon=True).start()
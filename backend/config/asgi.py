@@ -14,3 +14,15 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_asgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if settings.TYPEAHEAD_BUILD_ON_STARTUP:
+    # Build the title typeahead index while the worker starts serving
+    from core.typeahead import start_title_index_build  # noqa: E402
+    start_title_index_build()
+
+if settings.CACHE_WARMING_ON_STARTUP:
+    # Precompute responses for the most viewed papers and most frequent searches
+    from api.warming import start_cache_warming  # noqa: E402
+    start_cache_warming()
@@ -1,6 +1,7 @@
 # backend/config/settings.py
 import os
 import dj_database_url
+from corsheaders.defaults import default_headers
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -38,6 +39,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.session_id_middleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -70,11 +72,108 @@ DATABASES = {
     )
 }
 
+# Connection pool used by utils.postgresql_utils.PostgreSQLClient
+POSTGRES_POOL_MIN_CONN = int(os.environ.get('POSTGRES_POOL_MIN_CONN', '1'))
+POSTGRES_POOL_MAX_CONN = int(os.environ.get('POSTGRES_POOL_MAX_CONN', '10'))
+POSTGRES_POOL_TIMEOUT = float(os.environ.get('POSTGRES_POOL_TIMEOUT', '30'))
+POSTGRES_HEALTH_CHECK_INTERVAL = float(os.environ.get('POSTGRES_HEALTH_CHECK_INTERVAL', '30'))
+
 # MongoDB connection
 MONGODB_URI = os.environ.get('MONGODB_URI', 'mongodb://localhost:27017/paper_recommendation')
+MONGODB_MAX_POOL_SIZE = int(os.environ.get('MONGODB_MAX_POOL_SIZE', '50'))
+MONGODB_MIN_POOL_SIZE = int(os.environ.get('MONGODB_MIN_POOL_SIZE', '0'))
+MONGODB_MAX_IDLE_TIME_MS = int(os.environ.get('MONGODB_MAX_IDLE_TIME_MS', '300000'))
 
 # LanceDB Path
 LANCEDB_PATH = os.environ.get('LANCEDB_PATH', os.path.join(os.path.dirname(BASE_DIR), 'processed_data/lancedb_directory'))
+LANCEDB_TABLE_REFRESH_INTERVAL = float(os.environ.get('LANCEDB_TABLE_REFRESH_INTERVAL', '5'))
+LANCEDB_SEARCH_THREADS = int(os.environ.get('LANCEDB_SEARCH_THREADS', '4'))
+
+# Cache backends (swap for a shared backend such as Redis in production)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'researchpal',
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', '10000')),
+        },
+    }
+}
+
+# Query embedding cache used by search (per-process LRU, optionally shared
+# through a Django cache alias such as 'default')
+QUERY_EMBEDDING_CACHE_SIZE = int(os.environ.get('QUERY_EMBEDDING_CACHE_SIZE', '10000'))
+QUERY_EMBEDDING_CACHE_BACKEND = os.environ.get('QUERY_EMBEDDING_CACHE_BACKEND') or None
+QUERY_EMBEDDING_CACHE_TIMEOUT = int(os.environ.get('QUERY_EMBEDDING_CACHE_TIMEOUT', '86400'))
+
+# Response-level cache for search and recommendation results
+RESULT_CACHE_BACKEND = os.environ.get('RESULT_CACHE_BACKEND', 'default')
+RESULT_CACHE_TIMEOUT = int(os.environ.get('RESULT_CACHE_TIMEOUT', '300'))
+RESULT_CACHE_VERSION_CHECK_INTERVAL = int(os.environ.get('RESULT_CACHE_VERSION_CHECK_INTERVAL', '30'))
+
+# Micro-batching of concurrent searches on the async endpoints
+SEARCH_BATCH_WINDOW_MS = float(os.environ.get('SEARCH_BATCH_WINDOW_MS', '5'))
+SEARCH_BATCH_MAX_SIZE = int(os.environ.get('SEARCH_BATCH_MAX_SIZE', '32'))
+
+# Write-behind buffering of PaperView/UserSearch events
+ANALYTICS_BUFFERED = os.environ.get('ANALYTICS_BUFFERED', 'True') == 'True'
+ANALYTICS_BUFFER_SIZE = int(os.environ.get('ANALYTICS_BUFFER_SIZE', '500'))
+ANALYTICS_FLUSH_INTERVAL = float(os.environ.get('ANALYTICS_FLUSH_INTERVAL', '5'))
+
+# How much each interaction type moves a user's profile vector (negative pushes away)
+INTERACTION_WEIGHTS = {
+    'like': 1.0,
+    'save': 0.8,
+    'download': 0.5,
+    'view': 0.1,
+    'dislike': -1.0,
+}
+
+# Session-based "continue exploring" recommendations
+SESSION_HISTORY_SIZE = int(os.environ.get('SESSION_HISTORY_SIZE', '20'))
+SESSION_HISTORY_DECAY = float(os.environ.get('SESSION_HISTORY_DECAY', '0.8'))
+SESSION_CENTROID_CACHE_TIMEOUT = int(os.environ.get('SESSION_CENTROID_CACHE_TIMEOUT', '1800'))
+
+# Browsing session id recorded with views and searches: read from the
+# X-Session-ID header or a signed cookie, never stored as a django_session row
+SESSION_ID_HEADER = 'X-Session-ID'
+SESSION_ID_COOKIE = os.environ.get('SESSION_ID_COOKIE', 'browsing_session')
+SESSION_ID_COOKIE_MAX_AGE = int(os.environ.get('SESSION_ID_COOKIE_MAX_AGE', str(60 * 60 * 24 * 365)))
+# Use 'None' (with SESSION_ID_COOKIE_SECURE) when the frontend is served from another site
+SESSION_ID_COOKIE_SAMESITE = os.environ.get('SESSION_ID_COOKIE_SAMESITE', 'Lax')
+SESSION_ID_COOKIE_SECURE = os.environ.get('SESSION_ID_COOKIE_SECURE', 'False') == 'True'
+
+# Item-item co-view model built by `manage.py build_coview_model`
+COVIEW_MODEL_DIR = os.environ.get('COVIEW_MODEL_DIR', os.path.join(os.path.dirname(BASE_DIR), 'processed_data/coview_model'))
+
+# TF-IDF term matrix written by data_pipeline/process_arxiv_data.py
+TERM_INDEX_DIR = os.environ.get('TERM_INDEX_DIR', os.path.join(os.path.dirname(BASE_DIR), 'processed_data/term_index'))
+
+# Title typeahead prefix index
+TYPEAHEAD_MAX_RESULTS = int(os.environ.get('TYPEAHEAD_MAX_RESULTS', '20'))
+TYPEAHEAD_REFRESH_INTERVAL = int(os.environ.get('TYPEAHEAD_REFRESH_INTERVAL', '900'))
+TYPEAHEAD_BUILD_ON_STARTUP = os.environ.get('TYPEAHEAD_BUILD_ON_STARTUP', 'True') == 'True'
+
+# Popularity-driven cache warming (`manage.py warm_caches`, or in-process on startup)
+CACHE_WARMING_ON_STARTUP = os.environ.get('CACHE_WARMING_ON_STARTUP', 'False') == 'True'
+CACHE_WARMING_INTERVAL = int(os.environ.get('CACHE_WARMING_INTERVAL', '0'))
+CACHE_WARMING_PAPERS = int(os.environ.get('CACHE_WARMING_PAPERS', '100'))
+CACHE_WARMING_QUERIES = int(os.environ.get('CACHE_WARMING_QUERIES', '100'))
+CACHE_WARMING_WINDOW_HOURS = int(os.environ.get('CACHE_WARMING_WINDOW_HOURS', '24'))
+
+# Estimated token budget for the passages in a RAG context
+RAG_CONTEXT_TOKEN_BUDGET = int(os.environ.get('RAG_CONTEXT_TOKEN_BUDGET', '512'))
+
+# Stored recommendation explanations are keyed by this version; bump it when the generator changes
+EXPLANATION_MODEL_VERSION = os.environ.get('EXPLANATION_MODEL_VERSION', 'template-v2')
+
+# Explanation generator and the bounded queue it runs on
+EXPLANATION_BACKEND = os.environ.get('EXPLANATION_BACKEND', 'rag.services.generation.TemplateBackend')
+EXPLANATION_LLM_MODEL = os.environ.get('EXPLANATION_LLM_MODEL', 'TinyLlama/TinyLlama-1.1B-Chat-v1.0')
+EXPLANATION_MAX_NEW_TOKENS = int(os.environ.get('EXPLANATION_MAX_NEW_TOKENS', '200'))
+EXPLANATION_MAX_CONCURRENCY = int(os.environ.get('EXPLANATION_MAX_CONCURRENCY', '2'))
+EXPLANATION_MAX_PENDING = int(os.environ.get('EXPLANATION_MAX_PENDING', '8'))
+EXPLANATION_TIMEOUT = float(os.environ.get('EXPLANATION_TIMEOUT', '60'))
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -112,10 +211,17 @@ AUTH_USER_MODEL = 'users.User'
 REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
     ],
 }
 
 # CORS settings
-CORS_ALLOW_ALL_ORIGINS = True  # Only for development
\ No newline at end of file
+CORS_ALLOW_ALL_ORIGINS = True  # Only for development
+# The frontend sends the browsing session cookie cross-origin
+CORS_ALLOW_CREDENTIALS = True
+CORS_ALLOW_HEADERS = (*default_headers, SESSION_ID_HEADER.lower())
\ No newline at end of file
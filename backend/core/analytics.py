@@ -0,0 +1,167 @@
+import atexit
+import re
+import threading
+import uuid
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from .models import PaperView, UserSearch
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Client-supplied session ids are opaque tokens such as UUIDs
+_SESSION_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{8,64}$')
+
+
+def get_session_id(request, create=True):
+    """Return the caller's browsing session id, without touching django_session.
+
+    The id comes from the X-Session-ID header or the signed session id
+    cookie. Without either a new id is made (unless `create` is False) and
+    the session id middleware sends it back as a cookie, so the next
+    request from the same client carries it.
+    """
+    if hasattr(request, '_session_id'):
+        return request._session_id
+
+    session_id = request.headers.get(settings.SESSION_ID_HEADER)
+    if not session_id or not _SESSION_ID_PATTERN.match(session_id):
+        session_id = request.get_signed_cookie(settings.SESSION_ID_COOKIE, default=None)
+    if session_id is None and create:
+        session_id = uuid.uuid4().hex
+        request._new_session_id = session_id
+    if session_id is not None:
+        request._session_id = session_id
+    return session_id
+
+
+def set_session_id_cookie(request, response):
+    """Send the session id made for this request back to the client as a signed cookie."""
+    session_id = getattr(request, '_new_session_id', None)
+    if session_id is not None:
+        response.set_signed_cookie(
+            settings.SESSION_ID_COOKIE,
+            session_id,
+            max_age=settings.SESSION_ID_COOKIE_MAX_AGE,
+            samesite=settings.SESSION_ID_COOKIE_SAMESITE,
+            secure=settings.SESSION_ID_COOKIE_SECURE,
+            httponly=True,
+        )
+    return response
+
+
+class AnalyticsWriter:
+    """Write-behind buffer for PaperView and UserSearch events.
+
+    Events are queued in memory and written with `bulk_create` once the buffer
+    reaches `max_buffer_size` or `flush_interval` seconds have passed, so the
+    request path never waits on an INSERT. Remaining events are flushed when
+    the worker process exits.
+    """
+
+    def __init__(self, max_buffer_size=500, flush_interval=5.0, enabled=True):
+        """Initialize the writer."""
+        self.max_buffer_size = max_buffer_size
+        self.flush_interval = flush_interval
+        self.enabled = enabled
+        self._buffers = {PaperView: [], UserSearch: []}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def record_view(self, paper, session_id, ip_address=None):
+        """Queue a paper view."""
+        self._record(PaperView(paper=paper, session_id=session_id, ip_address=ip_address))
+
+    def record_search(self, query, filters=None, result_count=0, session_id=None, user=None):
+        """Queue a search query."""
+        self._record(UserSearch(
+            user=user if user is not None and user.is_authenticated else None,
+            query=query,
+            filters=filters or {},
+            result_count=result_count,
+            session_id=session_id,
+        ))
+
+    def pending(self, model):
+        """Return a snapshot of the buffered, not yet written events for a model."""
+        with self._lock:
+            return list(self._buffers[model])
+
+    def _record(self, event):
+        """Buffer an event, or write it straight away when buffering is disabled."""
+        if not self.enabled:
+            event.save()
+            return
+
+        self._ensure_flusher()
+        with self._lock:
+            self._buffers[type(event)].append(event)
+            buffered = sum(len(events) for events in self._buffers.values())
+
+        if buffered >= self.max_buffer_size:
+            self._wakeup.set()
+
+    def flush(self):
+        """Write all buffered events with one bulk insert per model."""
+        with self._flush_lock:
+            with self._lock:
+                batches = {model: events for model, events in self._buffers.items() if events}
+                self._buffers = {model: [] for model in self._buffers}
+
+            written = 0
+            for model, events in batches.items():
+                try:
+                    with transaction.atomic():
+                        model.objects.bulk_create(events, batch_size=self.max_buffer_size)
+                    written += len(events)
+                except Exception as e:
+                    logger.error(f"Error writing {len(events)} {model.__name__} events: {str(e)}")
+            return written
+
+    def _ensure_flusher(self):
+        """Start the background flush thread on first use."""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="analytics-writer", daemon=True)
+                self._thread.start()
+                atexit.register(self.shutdown)
+
+    def _run(self):
+        """Flush on the size threshold or every `flush_interval` seconds until stopped."""
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+            close_old_connections()
+
+    def shutdown(self, timeout=10.0):
+        """Stop the flush thread and write whatever is still buffered."""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        self.flush()
+
+
+_analytics_writer = None
+_analytics_writer_lock = threading.Lock()
+
+
+def get_analytics_writer():
+    """Return the process-wide analytics writer."""
+    global _analytics_writer
+    if _analytics_writer is None:
+        with _analytics_writer_lock:
+            if _analytics_writer is None:
+                _analytics_writer = AnalyticsWriter(
+                    max_buffer_size=settings.ANALYTICS_BUFFER_SIZE,
+                    flush_interval=settings.ANALYTICS_FLUSH_INTERVAL,
+                    enabled=settings.ANALYTICS_BUFFERED,
+                )
+    return _analytics_writer
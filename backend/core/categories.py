@@ -0,0 +1,130 @@
+from django.db import transaction
+from django.db.models import Count
+from .models import Category, Paper, PaperCategory
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def split_categories(value):
+    """Split a space-separated categories string into distinct category names."""
+    if not value:
+        return []
+    return list(dict.fromkeys(value.split()))
+
+
+def month_of(date):
+    """Return the first day of a date's month, or None."""
+    return date.replace(day=1) if date else None
+
+
+def get_category_ids(names):
+    """Return {name: id} for the given category names, creating missing categories."""
+    names = set(names)
+    if not names:
+        return {}
+    Category.objects.bulk_create([Category(name=name) for name in names], ignore_conflicts=True)
+    return dict(Category.objects.filter(name__in=names).values_list('name', 'id'))
+
+
+def refresh_category_counts(category_ids=None):
+    """Recompute denormalized paper counts from the category index."""
+    categories = Category.objects.all()
+    if category_ids is not None:
+        categories = categories.filter(id__in=category_ids)
+
+    counts = dict(PaperCategory.objects
+                  .filter(category_id__in=categories.values('id'))
+                  .values_list('category_id')
+                  .annotate(n=Count('paper_id')))
+
+    updated = []
+    for category in categories.only('id', 'paper_count'):
+        count = counts.get(category.id, 0)
+        if category.paper_count != count:
+            category.paper_count = count
+            updated.append(category)
+    Category.objects.bulk_update(updated, ['paper_count'], batch_size=1000)
+
+
+def index_paper_categories(papers, refresh_counts=True):
+    """Replace the category links of the given papers from their `categories` strings.
+
+    `papers` is an iterable of (paper id, categories string, update date)
+    tuples or Paper instances. Category counts and the facet counts of every
+    (category, month) cell the papers moved into or out of are refreshed; set
+    `refresh_counts` to False when the caller rebuilds them once after
+    indexing many batches.
+    """
+    from .facets import refresh_facet_counts
+
+    rows = [(p.id, p.categories, p.update_date) if isinstance(p, Paper) else p for p in papers]
+    if not rows:
+        return 0
+
+    papers_by_id = {
+        str(paper_id): (split_categories(categories), month_of(update_date))
+        for paper_id, categories, update_date in rows
+    }
+    category_ids = get_category_ids({name for names, _ in papers_by_id.values() for name in names})
+
+    with transaction.atomic():
+        old_links = PaperCategory.objects.filter(paper_id__in=list(papers_by_id))
+        touched_cells = set(old_links.values_list('category_id', 'month'))
+        old_links.delete()
+
+        links = [
+            PaperCategory(paper_id=paper_id, category_id=category_ids[name], month=month)
+            for paper_id, (names, month) in papers_by_id.items()
+            for name in names
+        ]
+        PaperCategory.objects.bulk_create(links, batch_size=1000)
+
+        if refresh_counts:
+            touched_cells.update((link.category_id, link.month) for link in links)
+            refresh_category_counts({category_id for category_id, _ in touched_cells})
+            refresh_facet_counts(touched_cells)
+
+    return len(links)
+
+
+def rebuild_category_index(batch_size=5000):
+    """Rebuild the category index for every paper."""
+    from .facets import refresh_facet_counts
+
+    indexed = 0
+    batch = []
+    rows = Paper.objects.order_by('id').values_list('id', 'categories', 'update_date')
+    for row in rows.iterator(chunk_size=batch_size):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            indexed += index_paper_categories(batch, refresh_counts=False)
+            batch = []
+    if batch:
+        indexed += index_paper_categories(batch, refresh_counts=False)
+
+    refresh_category_counts()
+    refresh_facet_counts()
+    logger.info(f"Indexed {indexed} paper categories")
+    return indexed
+
+
+def filter_by_categories(queryset, any_of=None, all_of=None):
+    """Filter a Paper queryset through the category index.
+
+    `any_of` keeps papers in at least one of the categories, `all_of` keeps
+    papers in every one of them.
+    """
+    if any_of:
+        queryset = queryset.filter(id__in=PaperCategory.objects
+                                   .filter(category__name__in=any_of)
+                                   .values('paper_id'))
+    if all_of:
+        all_of = set(all_of)
+        queryset = queryset.filter(id__in=PaperCategory.objects
+                                   .filter(category__name__in=all_of)
+                                   .values('paper_id')
+                                   .annotate(n=Count('category_id'))
+                                   .filter(n=len(all_of))
+                                   .values('paper_id'))
+    return queryset
@@ -0,0 +1,112 @@
+from collections import Counter
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import ExtractYear, TruncMonth
+from .categories import split_categories
+from .models import Category, CategoryMonthCount, Paper, PaperCategory, PaperMonthCount
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def refresh_facet_counts(cells=None):
+    """Recompute the precomputed facet counts.
+
+    `cells` is a set of (category id, month) pairs whose counts may have
+    changed; counts are refreshed for those categories and months only.
+    Pass None to rebuild every count.
+    """
+    links = PaperCategory.objects.exclude(month=None)
+    category_counts = CategoryMonthCount.objects.all()
+    papers = Paper.objects.exclude(update_date=None)
+    month_counts = PaperMonthCount.objects.all()
+
+    if cells is not None:
+        cells = {(category_id, month) for category_id, month in cells if month is not None}
+        if not cells:
+            return
+        category_ids = {category_id for category_id, _ in cells}
+        months = {month for _, month in cells}
+        links = links.filter(category_id__in=category_ids, month__in=months)
+        category_counts = category_counts.filter(category_id__in=category_ids, month__in=months)
+        papers = papers.filter(update_date__gte=min(months), update_date__lt=_next_month(max(months)))
+        month_counts = month_counts.filter(month__in=months)
+
+    with transaction.atomic():
+        # Category x month counts, read from the category index
+        counts = {
+            (row['category_id'], row['month']): row['n']
+            for row in links.values('category_id', 'month').annotate(n=Count('id'))
+        }
+        category_counts.delete()
+        CategoryMonthCount.objects.bulk_create(
+            [CategoryMonthCount(category_id=category_id, month=month, paper_count=n)
+             for (category_id, month), n in counts.items()],
+            batch_size=1000,
+        )
+
+        # Month counts over distinct papers, so cross-listed papers count once
+        counts = {
+            row['month']: row['n']
+            for row in papers.annotate(month=TruncMonth('update_date')).values('month').annotate(n=Count('id'))
+        }
+        if cells is not None:
+            counts = {month: n for month, n in counts.items() if month in months}
+        month_counts.delete()
+        PaperMonthCount.objects.bulk_create(
+            [PaperMonthCount(month=month, paper_count=n) for month, n in counts.items()],
+            batch_size=1000,
+        )
+
+
+def _next_month(month):
+    """Return the first day of the month after `month`."""
+    return month.replace(year=month.year + 1, month=1) if month.month == 12 else month.replace(month=month.month + 1)
+
+
+def get_facets(category=None, year=None):
+    """Return category and year facet counts from the precomputed tables.
+
+    Category counts are restricted to `year` and year counts to `category`
+    when given.
+    """
+    if year:
+        category_rows = (CategoryMonthCount.objects
+                         .filter(month__year=year)
+                         .values('category__name')
+                         .annotate(count=Sum('paper_count')))
+        categories = {row['category__name']: row['count'] for row in category_rows}
+    else:
+        categories = dict(Category.objects.filter(paper_count__gt=0).values_list('name', 'paper_count'))
+
+    if category:
+        year_rows = CategoryMonthCount.objects.filter(category__name=category)
+    else:
+        year_rows = PaperMonthCount.objects.all()
+    years = {
+        row['year']: row['count']
+        for row in year_rows.annotate(year=ExtractYear('month')).values('year').annotate(count=Sum('paper_count'))
+    }
+
+    return _format_facets(categories, years)
+
+
+def get_result_facets(papers):
+    """Count category and year facets over an already fetched result set."""
+    categories = Counter(name for paper in papers for name in split_categories(paper.categories))
+    years = Counter(paper.update_date.year for paper in papers if paper.update_date)
+    return _format_facets(categories, years)
+
+
+def _format_facets(categories, years):
+    """Sort facet counts for the API response."""
+    return {
+        "categories": [
+            {"name": name, "count": count}
+            for name, count in sorted(categories.items(), key=lambda item: (-item[1], item[0]))
+        ],
+        "years": [
+            {"year": year, "count": count}
+            for year, count in sorted(years.items(), reverse=True)
+        ],
+    }
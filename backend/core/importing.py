@@ -0,0 +1,150 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import pandas as pd
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+from .categories import index_paper_categories, refresh_category_counts
+from .facets import refresh_facet_counts
+from .models import Paper
+import logging
+
+logger = logging.getLogger(__name__)
+
+PAPER_COLUMNS = ['id', 'title', 'abstract', 'authors', 'categories', 'comments', 'update_date']
+UPDATE_FIELDS = ['title', 'abstract', 'authors', 'categories', 'comments', 'update_date', 'updated_at']
+
+
+def normalize_chunk(df):
+    """Convert a chunk of the processed CSV into Paper field columns.
+
+    Applies the same conversions as the row-by-row import, column-wise.
+    Duplicate ids keep their last row, since one upsert statement cannot
+    touch a row twice.
+    """
+    df = df.drop_duplicates(subset='id', keep='last')
+    rows = pd.DataFrame({
+        'id': df['id'].astype(str),
+        'title': df['title'].fillna(''),
+        'abstract': df['abstract'].fillna(''),
+        'authors': df['authors'].map(lambda authors: authors.split(',') if isinstance(authors, str) else []),
+        'categories': df['categories'].fillna(''),
+    })
+    rows['comments'] = df['comments'].fillna('') if 'comments' in df else ''
+    if 'update_date' in df:
+        dates = pd.to_datetime(df['update_date'], errors='coerce')
+        rows['update_date'] = dates.dt.date.astype(object).where(dates.notna(), None)
+    else:
+        rows['update_date'] = None
+    return rows
+
+
+class BulkPaperImporter:
+    """Chunked, upserting importer for the processed papers CSV.
+
+    The CSV is read `chunk_size` rows at a time and each chunk is upserted
+    in one transaction, with `bulk_create(update_conflicts=True)` or, on
+    PostgreSQL with `use_copy`, with COPY into a staging table. With
+    `workers` > 1 chunks are written concurrently (not on SQLite, which
+    allows a single writer). Category links are indexed per chunk and the
+    category and facet counts are rebuilt once at the end.
+    """
+
+    def __init__(self, chunk_size=5000, workers=1, use_copy=False):
+        """Initialize the importer."""
+        self.chunk_size = chunk_size
+        self.workers = max(1, workers)
+        if self.workers > 1 and connection.vendor == 'sqlite':
+            logger.warning("SQLite allows a single writer, importing with one worker")
+            self.workers = 1
+        self.use_copy = use_copy and connection.vendor == 'postgresql'
+        if use_copy and not self.use_copy:
+            logger.warning(f"COPY needs PostgreSQL, using bulk_create on {connection.vendor}")
+
+    def upsert_orm(self, rows):
+        """Upsert a normalized chunk with one bulk_create statement per batch."""
+        papers = [Paper(**row) for row in rows.to_dict('records')]
+        Paper.objects.bulk_create(
+            papers,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['id'],
+            update_fields=UPDATE_FIELDS,
+        )
+
+    def upsert_copy(self, rows):
+        """Upsert a normalized chunk through COPY and a staging table, on Django's connection.
+
+        Runs in the caller's transaction, so the chunk commits as a whole.
+        """
+        from utils.postgresql_utils import PostgreSQLClient
+
+        now = timezone.now()
+        columns = PAPER_COLUMNS + ['created_at', 'updated_at']
+        values = ((*row, now, now) for row in rows[PAPER_COLUMNS].itertuples(index=False, name=None))
+        with connection.cursor() as cursor:
+            PostgreSQLClient().upsert_rows_on_cursor(cursor.cursor, Paper._meta.db_table, columns, values,
+                                                     conflict_columns=['id'], update_columns=UPDATE_FIELDS)
+
+    def import_chunk(self, df):
+        """Upsert one chunk and return (created, updated, category index rows)."""
+        try:
+            rows = normalize_chunk(df)
+            ids = rows['id'].tolist()
+            with transaction.atomic():
+                existing = set(Paper.objects.filter(id__in=ids).values_list('id', flat=True))
+                if self.use_copy:
+                    self.upsert_copy(rows)
+                else:
+                    self.upsert_orm(rows)
+            index_rows = list(zip(ids, rows['categories'], rows['update_date']))
+            return len(ids) - len(existing), len(existing), index_rows
+        finally:
+            close_old_connections()
+
+    def run(self, file_path, limit=None, progress=None):
+        """Import the CSV and return a stats dict.
+
+        `progress` is called with the number of rows in each finished chunk.
+        """
+        stats = {'created': 0, 'updated': 0, 'failed': 0, 'rows': 0, 'seconds': 0.0, 'rows_per_second': 0.0}
+        started = time.monotonic()
+
+        def collect(result, size):
+            try:
+                created, updated, index_rows = result()
+                index_paper_categories(index_rows, refresh_counts=False)
+                stats['created'] += created
+                stats['updated'] += updated
+            except Exception as e:
+                logger.error(f"Error importing chunk of {size} papers: {str(e)}")
+                stats['failed'] += size
+            stats['rows'] += size
+            if progress:
+                progress(size)
+
+        # Ids are read as strings so that arXiv ids such as 0704.0001 keep their leading zero
+        chunks = pd.read_csv(file_path, chunksize=self.chunk_size, nrows=limit, dtype={'id': str})
+        if self.workers == 1:
+            for chunk in chunks:
+                collect(lambda: self.import_chunk(chunk), len(chunk))
+        else:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="import") as executor:
+                pending = {}
+                for chunk in chunks:
+                    # Keep a bounded number of chunks in memory
+                    while len(pending) >= self.workers * 2:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            collect(future.result, pending.pop(future))
+                    pending[executor.submit(self.import_chunk, chunk)] = len(chunk)
+                for future in list(pending):
+                    collect(future.result, pending.pop(future))
+
+        refresh_category_counts()
+        refresh_facet_counts()
+
+        stats['seconds'] = time.monotonic() - started
+        stats['rows_per_second'] = stats['rows'] / stats['seconds'] if stats['seconds'] else 0.0
+        logger.info(f"Imported {stats['rows']} papers in {stats['seconds']:.1f}s "
+                    f"({stats['rows_per_second']:.0f} rows/s)")
+        return stats
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from core.categories import rebuild_category_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the normalized paper-category index, category counts and facet counts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Number of papers indexed per batch')
+
+    def handle(self, *args, **options):
+        indexed = rebuild_category_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Category index rebuilt: {indexed} paper-category links'))
@@ -3,6 +3,9 @@ import os
 from django.core.management.base import BaseCommand
 from django.conf import settings
 from core.models import Paper
+from core.categories import index_paper_categories, refresh_category_counts
+from core.facets import refresh_facet_counts
+from core.importing import BulkPaperImporter
 from tqdm import tqdm
 import logging
 
@@ -14,6 +17,10 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument('--file', type=str, help='Path to CSV file')
         parser.add_argument('--limit', type=int, default=None, help='Limit number of papers to import')
+        parser.add_argument('--bulk', action='store_true', help='Stream the file in chunks and upsert each chunk in bulk')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Rows per chunk in bulk mode')
+        parser.add_argument('--workers', type=int, default=1, help='Chunks written concurrently in bulk mode')
+        parser.add_argument('--copy', action='store_true', help='Upsert chunks with COPY on PostgreSQL in bulk mode')
     
     def handle(self, *args, **options):
         file_path = options['file']
@@ -25,6 +32,10 @@ class Command(BaseCommand):
         
         self.stdout.write(self.style.SUCCESS(f'Importing papers from {file_path}'))
         
+        if options['bulk']:
+            self.handle_bulk(file_path, limit, options)
+            return
+        
         # Load data
         df = pd.read_csv(file_path)
         if limit:
@@ -33,6 +44,7 @@ class Command(BaseCommand):
         # Import papers
         papers_created = 0
         papers_updated = 0
+        imported = []
         
         for _, row in tqdm(df.iterrows(), total=len(df), desc="Importing papers"):
             try:
@@ -52,10 +64,32 @@ class Command(BaseCommand):
                     papers_created += 1
                 else:
                     papers_updated += 1
+                
+                imported.append((paper.id, paper.categories, paper.update_date))
             
             except Exception as e:
                 logger.error(f"Error importing paper {row['id']}: {str(e)}")
         
+        # Index the imported papers' categories, then recount categories and facets once
+        for i in range(0, len(imported), 1000):
+            index_paper_categories(imported[i:i + 1000], refresh_counts=False)
+        refresh_category_counts()
+        refresh_facet_counts()
+        
         self.stdout.write(self.style.SUCCESS(
             f'Import completed: {papers_created} papers created, {papers_updated} papers updated'
-        ))
\ No newline at end of file
+        ))
+    
+    def handle_bulk(self, file_path, limit, options):
+        importer = BulkPaperImporter(
+            chunk_size=options['chunk_size'],
+            workers=options['workers'],
+            use_copy=options['copy'],
+        )
+        with tqdm(total=limit, unit='rows', desc="Importing papers") as progress:
+            stats = importer.run(file_path, limit=limit, progress=progress.update)
+        
+        self.stdout.write(self.style.SUCCESS(
+            f"Import completed: {stats['created']} papers created, {stats['updated']} papers updated, "
+            f"{stats['failed']} failed in {stats['seconds']:.1f}s ({stats['rows_per_second']:.0f} rows/s)"
+        ))
@@ -0,0 +1,17 @@
+from asgiref.sync import iscoroutinefunction
+from django.utils.decorators import sync_and_async_middleware
+from .analytics import set_session_id_cookie
+
+
+@sync_and_async_middleware
+def session_id_middleware(get_response):
+    """Set the browsing session id cookie on responses that made a new id."""
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            response = await get_response(request)
+            return set_session_id_cookie(request, response)
+    else:
+        def middleware(request):
+            response = get_response(request)
+            return set_session_id_cookie(request, response)
+    return middleware
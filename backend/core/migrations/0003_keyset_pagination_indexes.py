@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_paperview_usersearch_event_timestamps'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='paper',
+            index=models.Index(fields=['update_date', 'id'], name='core_paper_update__040863_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paperview',
+            index=models.Index(fields=['timestamp', 'id'], name='core_paperv_timesta_07e0e8_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:36
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0003_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserProfileVector',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('model_name', models.CharField(default='allenai-specter', max_length=100)),
+                ('vector_sum', models.BinaryField()),
+                ('total_weight', models.FloatField(default=0.0)),
+                ('interaction_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='profile_vectors', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'model_name')},
+            },
+        ),
+    ]
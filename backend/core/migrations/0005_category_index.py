@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_userprofilevector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Category',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('paper_count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PaperCategory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='paper_links', to='core.category')),
+                ('paper', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='category_links', to='core.paper')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['paper'], name='core_paperc_paper_i_120245_idx')],
+                'unique_together': {('category', 'paper')},
+            },
+        ),
+    ]
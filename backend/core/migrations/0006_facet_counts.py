@@ -0,0 +1,52 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_category_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryMonthCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('paper_count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PaperMonthCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(unique=True)),
+                ('paper_count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='papercategory',
+            name='month',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='papercategory',
+            index=models.Index(fields=['category', 'month'], name='core_paperc_categor_a7edfc_idx'),
+        ),
+        migrations.AddField(
+            model_name='categorymonthcount',
+            name='category',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='month_counts', to='core.category'),
+        ),
+        migrations.AddIndex(
+            model_name='categorymonthcount',
+            index=models.Index(fields=['month'], name='core_catego_month_b6b5af_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='categorymonthcount',
+            unique_together={('category', 'month')},
+        ),
+    ]
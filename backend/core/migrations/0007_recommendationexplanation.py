@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_facet_counts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecommendationExplanation',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('model_version', models.CharField(max_length=100)),
+                ('explanation', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('recommended_paper', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='explained_for', to='core.paper')),
+                ('source_paper', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='explanations_made', to='core.paper')),
+            ],
+            options={
+                'unique_together': {('source_paper', 'recommended_paper', 'model_version')},
+            },
+        ),
+    ]
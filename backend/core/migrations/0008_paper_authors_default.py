@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:05
+
+import core.models
+from django.db import migrations
+
+
+def decode_empty_authors(apps, schema_editor):
+    """Store the old `str([])` default, saved as the JSON string '"[]"', as an empty list."""
+    Paper = apps.get_model('core', 'Paper')
+    # The lookup value is JSON-encoded too, so the string '[]' matches the stored '"[]"'
+    Paper.objects.filter(authors='[]').update(authors=[])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_recommendationexplanation'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='paper',
+            name='authors',
+            field=core.models.JSONField(default=list),
+        ),
+        migrations.RunPython(decode_empty_authors, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:20
+
+from django.db import migrations
+from django.db.models import Count
+from django.db.models.functions import TruncMonth
+
+
+def backfill_category_index(apps, schema_editor):
+    """Index the categories of papers without category links and rebuild the counts."""
+    Paper = apps.get_model('core', 'Paper')
+    Category = apps.get_model('core', 'Category')
+    PaperCategory = apps.get_model('core', 'PaperCategory')
+    CategoryMonthCount = apps.get_model('core', 'CategoryMonthCount')
+    PaperMonthCount = apps.get_model('core', 'PaperMonthCount')
+
+    def index_batch(rows):
+        papers = {
+            paper_id: (list(dict.fromkeys((categories or '').split())),
+                       update_date.replace(day=1) if update_date else None)
+            for paper_id, categories, update_date in rows
+        }
+        names = {name for names, _ in papers.values() for name in names}
+        Category.objects.bulk_create([Category(name=name) for name in names], ignore_conflicts=True)
+        category_ids = dict(Category.objects.filter(name__in=names).values_list('name', 'id'))
+        PaperCategory.objects.bulk_create(
+            [PaperCategory(paper_id=paper_id, category_id=category_ids[name], month=month)
+             for paper_id, (names, month) in papers.items()
+             for name in names],
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+
+    unindexed = (Paper.objects
+                 .exclude(id__in=PaperCategory.objects.values('paper_id'))
+                 .order_by('id')
+                 .values_list('id', 'categories', 'update_date'))
+    batch = []
+    for row in unindexed.iterator(chunk_size=5000):
+        batch.append(row)
+        if len(batch) >= 5000:
+            index_batch(batch)
+            batch = []
+    if batch:
+        index_batch(batch)
+
+    counts = dict(PaperCategory.objects.values_list('category_id').annotate(n=Count('paper_id')))
+    categories = list(Category.objects.only('id', 'paper_count'))
+    for category in categories:
+        category.paper_count = counts.get(category.id, 0)
+    Category.objects.bulk_update(categories, ['paper_count'], batch_size=1000)
+
+    CategoryMonthCount.objects.all().delete()
+    CategoryMonthCount.objects.bulk_create(
+        [CategoryMonthCount(category_id=row['category_id'], month=row['month'], paper_count=row['n'])
+         for row in (PaperCategory.objects.exclude(month=None)
+                     .values('category_id', 'month').annotate(n=Count('id')))],
+        batch_size=1000,
+    )
+
+    PaperMonthCount.objects.all().delete()
+    PaperMonthCount.objects.bulk_create(
+        [PaperMonthCount(month=row['month'], paper_count=row['n'])
+         for row in (Paper.objects.exclude(update_date=None)
+                     .annotate(month=TruncMonth('update_date')).values('month').annotate(n=Count('id')))],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_paper_authors_default'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_category_index, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,18 @@
 from django.db import models
+from django.utils import timezone
 import uuid
 import json
 from users.models import User
 
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:  # orjson is an optional speedup
+    _json_loads = json.loads
+
+# Decoded values for the defaults most rows carry, so they skip the parser entirely
+_EMPTY_JSON = {'[]': list, '{}': dict}
+
 # Custom JSON field for SQLite compatibility
 class JSONField(models.TextField):
     """
@@ -12,7 +22,10 @@ class JSONField(models.TextField):
     def from_db_value(self, value, expression, connection):
         if value is None:
             return value
-        return json.loads(value)
+        empty = _EMPTY_JSON.get(value)
+        if empty is not None:
+            return empty()
+        return _json_loads(value)
 
     def to_python(self, value):
         if value is None:
@@ -33,7 +46,7 @@ class Paper(models.Model):
     title = models.CharField(max_length=500)
     abstract = models.TextField()
     # Replace ArrayField with JSONField for SQLite compatibility
-    authors = JSONField(default=str([]))
+    authors = JSONField(default=list)
     categories = models.CharField(max_length=100)
     comments = models.TextField(blank=True, null=True)
     journal_ref = models.CharField(max_length=255, blank=True, null=True)
@@ -46,11 +59,56 @@ class Paper(models.Model):
         indexes = [
             models.Index(fields=['categories']),
             models.Index(fields=['update_date']),
+            # Keyset pagination orders by update date with the primary key as tiebreak
+            models.Index(fields=['update_date', 'id']),
         ]
     
     def __str__(self):
         return self.title
 
+class Category(models.Model):
+    """Model for an arXiv category, with a denormalized paper count."""
+    
+    name = models.CharField(max_length=50, unique=True)
+    paper_count = models.IntegerField(default=0)
+    
+    def __str__(self):
+        return self.name
+
+class PaperCategory(models.Model):
+    """Model linking papers to each of their (space-separated) categories."""
+    
+    paper = models.ForeignKey(Paper, on_delete=models.CASCADE, related_name='category_links')
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='paper_links')
+    # First day of the paper's update month, copied here so facet counts can be read from the index
+    month = models.DateField(null=True, blank=True)
+    
+    class Meta:
+        unique_together = ('category', 'paper')
+        indexes = [
+            models.Index(fields=['paper']),
+            models.Index(fields=['category', 'month']),
+        ]
+
+class CategoryMonthCount(models.Model):
+    """Model for precomputed paper counts per category and update month."""
+    
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='month_counts')
+    month = models.DateField()
+    paper_count = models.IntegerField(default=0)
+    
+    class Meta:
+        unique_together = ('category', 'month')
+        indexes = [
+            models.Index(fields=['month']),
+        ]
+
+class PaperMonthCount(models.Model):
+    """Model for precomputed paper counts per update month, across all categories."""
+    
+    month = models.DateField(unique=True)
+    paper_count = models.IntegerField(default=0)
+
 class PaperView(models.Model):
     """Model for tracking paper views."""
     
@@ -58,12 +116,14 @@ class PaperView(models.Model):
     paper = models.ForeignKey(Paper, on_delete=models.CASCADE, related_name='views')
     session_id = models.CharField(max_length=255)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Set when the event happens rather than on save, since views are written behind
+    timestamp = models.DateTimeField(default=timezone.now)
     
     class Meta:
         indexes = [
             models.Index(fields=['session_id']),
             models.Index(fields=['timestamp']),
+            models.Index(fields=['timestamp', 'id']),
         ]
 
 class PaperEmbedding(models.Model):
@@ -100,6 +160,19 @@ class Recommendation(models.Model):
             models.Index(fields=['recommendation_date']),
         ]
 
+class RecommendationExplanation(models.Model):
+    """Model for storing generated explanations for (source, recommended) paper pairs."""
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    source_paper = models.ForeignKey(Paper, on_delete=models.CASCADE, related_name='explanations_made')
+    recommended_paper = models.ForeignKey(Paper, on_delete=models.CASCADE, related_name='explained_for')
+    model_version = models.CharField(max_length=100)
+    explanation = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        unique_together = ('source_paper', 'recommended_paper', 'model_version')
+
 class UserPaperInteraction(models.Model):
     """Model for tracking user interactions with papers."""
     
@@ -124,6 +197,21 @@ class UserPaperInteraction(models.Model):
             models.Index(fields=['timestamp']),
         ]
 
+class UserProfileVector(models.Model):
+    """Model for a user's incrementally maintained preference vector."""
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='profile_vectors')
+    model_name = models.CharField(max_length=100, default="allenai-specter")
+    # Weighted sum of interacted paper vectors, stored as raw float32 bytes
+    vector_sum = models.BinaryField()
+    total_weight = models.FloatField(default=0.0)
+    interaction_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ('user', 'model_name')
+
 class UserSearch(models.Model):
     """Model for tracking user search queries."""
     
@@ -132,7 +220,7 @@ class UserSearch(models.Model):
     query = models.TextField()
     filters = JSONField(default=dict)  # Using our custom JSONField
     result_count = models.IntegerField(default=0)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(default=timezone.now)
     session_id = models.CharField(max_length=100, blank=True, null=True)
     
     class Meta:
@@ -0,0 +1,207 @@
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+import numpy as np
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Count
+from .models import Paper, PaperView
+import logging
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """Lowercase, strip accents and split text into word tokens."""
+    text = unicodedata.normalize('NFKD', text or '').encode('ascii', 'ignore').decode('ascii')
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class TitlePrefixIndex:
+    """In-memory prefix index over normalized paper title tokens.
+
+    Papers are numbered by popularity (PaperView count, most viewed first), so
+    a lower paper number always ranks higher. The distinct title tokens are
+    kept in a sorted list and each token's postings (paper numbers, ascending)
+    are concatenated in token order into one int32 array. A prefix therefore
+    maps by binary search to a contiguous slice of postings, and its best
+    matches are the smallest paper numbers in that slice. Slices longer than
+    `max_scan` are answered from top lists precomputed at build time. The
+    remaining query prefixes are checked against the candidates' normalized
+    titles.
+    """
+
+    def __init__(self, max_results=20, max_scan=2000, max_checks=2000):
+        """Initialize an empty index."""
+        self.max_results = max_results
+        self.max_scan = max_scan
+        self.max_checks = max_checks
+        self.paper_ids = []
+        self.titles = []
+        self.normalized_titles = []
+        self.views = np.zeros(0, dtype=np.int64)
+        self.tokens = []
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.postings = np.zeros(0, dtype=np.int32)
+        self.top_lists = {}
+        self.built_at = None
+
+    def build(self):
+        """Build the index from Paper titles ranked by PaperView counts."""
+        start = time.perf_counter()
+        views = dict(PaperView.objects.values_list('paper_id').annotate(n=Count('id')))
+        papers = list(Paper.objects.values_list('id', 'title').iterator(chunk_size=10000))
+        papers.sort(key=lambda row: (-views.get(row[0], 0), row[0]))
+
+        self.paper_ids = [paper_id for paper_id, _ in papers]
+        self.titles = [title for _, title in papers]
+        self.views = np.array([views.get(paper_id, 0) for paper_id in self.paper_ids], dtype=np.int64)
+
+        # Papers are visited in rank order, so every token's postings come out sorted
+        postings = {}
+        self.normalized_titles = []
+        for number, title in enumerate(self.titles):
+            tokens = tokenize(title)
+            self.normalized_titles.append(' ' + ' '.join(tokens))
+            for token in set(tokens):
+                postings.setdefault(token, []).append(number)
+
+        self.tokens = sorted(postings)
+        lengths = np.array([len(postings[token]) for token in self.tokens], dtype=np.int64)
+        self.offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        self.postings = (np.fromiter((n for token in self.tokens for n in postings[token]),
+                                     dtype=np.int32, count=int(self.offsets[-1]))
+                         if self.tokens else np.zeros(0, dtype=np.int32))
+
+        self.top_lists = {}
+        self._precompute_top_lists()
+        self.built_at = time.monotonic()
+        logger.info(f"Built title prefix index with {len(self.paper_ids)} papers and {len(self.tokens)} tokens "
+                    f"in {time.perf_counter() - start:.2f} s")
+        return self
+
+    def _token_range(self, prefix):
+        """Return the slice of `tokens` starting with `prefix`."""
+        lo = bisect_left(self.tokens, prefix)
+        return slice(lo, bisect_left(self.tokens, prefix + '\uffff', lo))
+
+    def _slice(self, prefix):
+        """Return the (start, end) postings range of the tokens starting with `prefix`."""
+        tokens = self._token_range(prefix)
+        return int(self.offsets[tokens.start]), int(self.offsets[tokens.stop])
+
+    def _top(self, start, end, limit):
+        """Return the `limit` best distinct paper numbers in a postings range."""
+        return np.unique(self.postings[start:end])[:limit]
+
+    def _precompute_top_lists(self):
+        """Precompute the best matches for every prefix whose postings exceed `max_scan`."""
+        # A prefix can only be long if its parent prefix is, so grow prefixes one character at a time
+        prefixes = {token[:1] for token in self.tokens}
+        while prefixes:
+            longer = set()
+            for prefix in prefixes:
+                start, end = self._slice(prefix)
+                if end - start > self.max_scan:
+                    self.top_lists[prefix] = self._top(start, end, self.max_checks)
+                    longer.update(token[:len(prefix) + 1] for token in self.tokens[self._token_range(prefix)]
+                                  if len(token) > len(prefix))
+            prefixes = longer
+
+    def _candidates(self, prefix, limit):
+        """Return candidate paper numbers for a prefix, best first."""
+        top = self.top_lists.get(prefix)
+        if top is not None:
+            return top[:limit]
+        start, end = self._slice(prefix)
+        return self._top(start, end, limit)
+
+    def complete(self, text, limit=10):
+        """Return up to `limit` (paper id, title, views) matches for typed text.
+
+        Every query token must prefix-match a title token. The last token is
+        usually still being typed, but earlier ones are matched as prefixes
+        too so partial words anywhere in the query work.
+        """
+        prefixes = list(dict.fromkeys(tokenize(text)))
+        if not prefixes or not self.tokens:
+            return []
+        limit = min(limit, self.max_results)
+
+        # Drive the lookup from the most selective prefix
+        ranges = {prefix: self._slice(prefix) for prefix in prefixes}
+        driver = min(prefixes, key=lambda prefix: ranges[prefix][1] - ranges[prefix][0])
+        others = [prefix for prefix in prefixes if prefix != driver]
+        candidates = self._candidates(driver, limit if not others else self.max_checks)
+
+        results = []
+        for number in candidates:
+            number = int(number)
+            if others:
+                normalized = self.normalized_titles[number]
+                if not all(' ' + prefix in normalized for prefix in others):
+                    continue
+            results.append((self.paper_ids[number], self.titles[number], int(self.views[number])))
+            if len(results) >= limit:
+                break
+        return results
+
+
+_title_index = None
+_title_index_lock = threading.Lock()
+_title_index_refreshing = threading.Lock()
+
+
+def _rebuild_title_index(initial=False):
+    """Build a new index and swap it in.
+
+    Background refreshes are skipped while another build runs; the initial
+    build waits for it instead.
+    """
+    global _title_index
+    if not _title_index_refreshing.acquire(blocking=initial):
+        return
+    try:
+        if initial and _title_index is not None:
+            return
+        _title_index = TitlePrefixIndex(max_results=settings.TYPEAHEAD_MAX_RESULTS).build()
+    except Exception as e:
+        logger.error(f"Error building title prefix index: {str(e)}")
+    finally:
+        _title_index_refreshing.release()
+
+
+def _build_in_background():
+    """Thread target for background builds."""
+    try:
+        _rebuild_title_index()
+    finally:
+        close_old_connections()
+
+
+def start_title_index_build():
+    """Build the title index in a background thread, e.g. when a worker starts."""
+    if not _title_index_refreshing.locked():
+        threading.Thread(target=_build_in_background, name="title-index-build", daemon=True).start()
+
+
+def get_title_index():
+    """Return the process-wide title prefix index.
+
+    The first call builds the index if no startup build has finished yet.
+    Afterwards a stale index keeps serving while a background thread rebuilds
+    it every `TYPEAHEAD_REFRESH_INTERVAL` seconds.
+    """
+    if _title_index is None:
+        with _title_index_lock:
+            if _title_index is None:
+                _rebuild_title_index(initial=True)
+                if _title_index is None:
+                    return TitlePrefixIndex()
+    elif time.monotonic() - _title_index.built_at > settings.TYPEAHEAD_REFRESH_INTERVAL:
+        start_title_index_build()
+    return _title_index
@@ -0,0 +1,36 @@
+import asyncio
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse
+from .services.explanation_service import ExplanationCache, ExplanationService
+from .services.jobs import GenerationQueueFull, get_generation_queue
+from .streaming import SSE_HEADERS, async_cached_events, async_job_events
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Async counterpart of the streamed explanation endpoint. Served under ASGI,
+# a request waiting for tokens holds no thread; only the bounded generation
+# pool does the work.
+
+
+async def explain_recommendation_stream(request):
+    """Stream the explanation for a recommendation as server-sent events."""
+    source_paper_id = request.GET.get('source_paper_id')
+    recommended_paper_id = request.GET.get('recommended_paper_id')
+    if not source_paper_id or not recommended_paper_id:
+        return JsonResponse({"error": "Both source_paper_id and recommended_paper_id are required"}, status=400)
+
+    cache = ExplanationCache()
+    explanation = await sync_to_async(cache.get)(source_paper_id, recommended_paper_id)
+    if explanation is not None:
+        events = async_cached_events(explanation)
+    else:
+        service = ExplanationService(model_version=cache.model_version)
+        try:
+            job = get_generation_queue().stream(service.stream_explanation, source_paper_id, recommended_paper_id,
+                                                loop=asyncio.get_running_loop())
+        except GenerationQueueFull as e:
+            return JsonResponse({"error": str(e)}, status=503, headers={"Retry-After": "5"})
+        events = async_job_events(job)
+
+    return StreamingHttpResponse(events, content_type='text/event-stream', headers=SSE_HEADERS)
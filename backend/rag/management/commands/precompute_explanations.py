@@ -0,0 +1,34 @@
+import time
+from django.core.management.base import BaseCommand
+from rag.services.explanation_service import ExplanationService
+
+
+class Command(BaseCommand):
+    help = "Precompute explanations for each paper's stored top-k recommendations"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--paper-ids', nargs='+', default=None,
+                            help='Only precompute for these source papers (defaults to every paper with recommendations)')
+        parser.add_argument('--top-k', type=int, default=10, help='Number of recommendations explained per paper')
+        parser.add_argument('--batch-size', type=int, default=500, help='Number of source papers per batch')
+        parser.add_argument('--model-version', type=str, default=None,
+                            help='Explanation version to store (defaults to EXPLANATION_MODEL_VERSION)')
+        parser.add_argument('--prune', action='store_true', help='Delete explanations stored for other versions')
+
+    def handle(self, *args, **options):
+        service = ExplanationService(model_version=options['model_version'])
+        start = time.perf_counter()
+
+        generated = service.precompute_explanations(
+            source_paper_ids=options['paper_ids'],
+            top_k=options['top_k'],
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Stored {generated} explanations for version {service.cache.model_version} '
+            f'in {time.perf_counter() - start:.1f}s'
+        ))
+
+        if options['prune']:
+            deleted = service.cache.prune()
+            self.stdout.write(f'Deleted {deleted} explanations from other versions')
@@ -1,8 +1,9 @@
 import logging
-from sentence_transformers import SentenceTransformer
-import lancedb
 from django.conf import settings
 from core.models import Paper
+from recommendation.diversify import normalize_rows
+from recommendation.services import get_embedding_model
+from utils.lancedb_utils import LanceDBClient, build_where_clause, fetch_vectors, quote_ids
 import numpy as np
 
 logger = logging.getLogger(__name__)
@@ -13,44 +14,140 @@ class ContextRetrievalService:
     def __init__(self, model_name="allenai-specter"):
         """Initialize the context retrieval service."""
         self.model_name = model_name
-        self.embedding_model = SentenceTransformer(model_name)
         
-        # Connect to LanceDB
-        self.db = lancedb.connect(settings.LANCEDB_PATH)
+        # Shared, cached LanceDB table handles
+        self.lance = LanceDBClient()
         self.table_name = "research_papers"
         
         # Check if table exists
-        if self.table_name not in self.db.table_names():
+        if not self.lance.table_exists(self.table_name):
             logger.error(f"Table {self.table_name} does not exist in LanceDB")
-        else:
-            self.table = self.db.open_table(self.table_name)
+        
+        # Sentence passages built by the data pipeline, optional
+        self.passage_table_name = "paper_passages"
+        if not self.lance.table_exists(self.passage_table_name):
+            logger.info(f"Table {self.passage_table_name} does not exist, using whole abstracts as context")
+    
+    @property
+    def table(self):
+        """The papers table handle, reopened by the client once the table has a new version."""
+        return self.lance.open_table(self.table_name)
+    
+    @property
+    def passage_table(self):
+        """The passages table handle, or None until the data pipeline has built it."""
+        if not self.lance.table_exists(self.passage_table_name):
+            return None
+        return self.lance.open_table(self.passage_table_name)
     
-    def get_relevant_papers(self, query_text, k=5):
+    @property
+    def embedding_model(self):
+        """The sentence transformer, loaded on first use."""
+        return get_embedding_model(self.model_name)
+    
+    def search_vector(self, vector, k=5, exclude_ids=None, max_rounds=3):
+        """Get the k papers nearest to a vector, never returning `exclude_ids`.
+        
+        The exclusion is pushed into the LanceDB query, so the search itself
+        returns k usable rows. Rows missing from the database are excluded in
+        a follow-up search until k papers are found or the table runs out.
+        """
+        exclude_ids = [str(pid) for pid in exclude_ids or []]
+        papers = []
+        for _ in range(max_rounds):
+            search = self.table.search(vector).metric("cosine")
+            where = build_where_clause({'exclude_ids': exclude_ids})
+            if where:
+                search = search.where(where, prefilter=True)
+            paper_ids = [str(pid) for pid in search.limit(k - len(papers)).to_pandas()['id']]
+            if not paper_ids:
+                break
+            
+            # Resolve the papers, keeping the similarity order
+            papers_dict = Paper.objects.in_bulk(paper_ids)
+            papers += [papers_dict[pid] for pid in paper_ids if pid in papers_dict]
+            if len(papers) >= k or len(papers_dict) == len(paper_ids):
+                break
+            exclude_ids += paper_ids
+        
+        return papers
+    
+    def get_relevant_papers(self, query_text, k=5, exclude_ids=None):
         """Get relevant papers for a query."""
         try:
             # Generate embedding for the query
             embedding = self.embedding_model.encode(query_text)
-            
-            # Search for similar papers in LanceDB
-            results = self.table.search(embedding).metric("cosine").limit(k).to_pandas()
-            
-            # Get paper objects
-            paper_ids = results['id'].tolist()
-            papers = list(Paper.objects.filter(id__in=paper_ids))
-            
-            # Sort papers by similarity
-            papers_dict = {str(paper.id): paper for paper in papers}
-            sorted_papers = [papers_dict[pid] if pid in papers_dict else None for pid in paper_ids]
-            sorted_papers = [p for p in sorted_papers if p is not None]
-            
-            return sorted_papers
+            return self.search_vector(embedding, k=k, exclude_ids=exclude_ids)
         
         except Exception as e:
             logger.error(f"Error getting relevant papers: {str(e)}")
             return []
     
-    def build_context_for_papers(self, paper1, paper2):
-        """Build context for explaining the relationship between two papers."""
+    def get_pair_vector(self, paper1, paper2):
+        """Return the mean of two papers' normalized stored vectors, or None if either is missing."""
+        try:
+            vectors = fetch_vectors(self.table, [paper1.id, paper2.id])
+        except Exception as e:
+            logger.error(f"Error getting stored vectors: {str(e)}")
+            return None
+        
+        if len(vectors) != 2:
+            return None
+        return normalize_rows(np.stack(list(vectors.values()))).mean(axis=0)
+    
+    def select_passages(self, vector, paper_ids, token_budget, max_candidates=100):
+        """Pick the passages of the given papers most relevant to a vector, within a token budget.
+        
+        Each paper's best passage is taken first so every paper is represented,
+        then the remaining passages in order of relevance while they fit.
+        Returns {paper id: [passage text, ...]} in each paper's reading order.
+        """
+        paper_ids = [str(pid) for pid in paper_ids]
+        candidates = (self.passage_table.search(vector).metric("cosine")
+                      .where(f"paper_id IN ({quote_ids(paper_ids)})", prefilter=True)
+                      .limit(max_candidates)
+                      .to_pandas())
+        
+        rows = list(candidates[['paper_id', 'position', 'text', 'n_tokens']].itertuples(index=False))
+        best = {}
+        for row in rows:
+            best.setdefault(row.paper_id, row)
+        
+        selected = []
+        used = 0
+        for row in [*best.values(), *rows]:
+            if row in selected or used + row.n_tokens > token_budget:
+                continue
+            selected.append(row)
+            used += row.n_tokens
+        
+        passages = {pid: [] for pid in paper_ids}
+        for row in sorted(selected, key=lambda row: row.position):
+            passages[row.paper_id].append(row.text)
+        return passages
+    
+    def get_related_papers_for_pair(self, paper1, paper2, k=3):
+        """Get k papers related to both papers of a pair, excluding the pair itself.
+        
+        The query vector is the mean of the two papers' normalized stored
+        vectors, so nothing has to be encoded. Papers without a stored vector
+        fall back to encoding their titles and abstracts.
+        """
+        exclude_ids = [str(paper1.id), str(paper2.id)]
+        vector = self.get_pair_vector(paper1, paper2)
+        if vector is not None:
+            return self.search_vector(vector, k=k, exclude_ids=exclude_ids)
+        
+        query_text = f"{paper1.title} {paper1.abstract} {paper2.title} {paper2.abstract}"
+        return self.get_relevant_papers(query_text, k=k, exclude_ids=exclude_ids)
+    
+    def build_context_for_papers(self, paper1, paper2, k=3, token_budget=None):
+        """Build context for explaining the relationship between two papers.
+        
+        With the passage index, each paper contributes its most relevant
+        sentences instead of its whole abstract, within `token_budget`
+        estimated tokens (RAG_CONTEXT_TOKEN_BUDGET by default).
+        """
         try:
             # Get both papers
             if isinstance(paper1, str):
@@ -58,39 +155,24 @@ class ContextRetrievalService:
             if isinstance(paper2, str):
                 paper2 = Paper.objects.get(id=paper2)
             
-            # Get query text combining both papers
-            query_text = f"{paper1.title} {paper1.abstract} {paper2.title} {paper2.abstract}"
+            vector = self.get_pair_vector(paper1, paper2)
             
             # Get related papers (excluding the input papers)
-            related_papers = self.get_relevant_papers(query_text, k=3)
-            related_papers = [p for p in related_papers 
-                            if str(p.id) != str(paper1.id) and str(p.id) != str(paper2.id)]
+            if vector is not None:
+                related_papers = self.search_vector(vector, k=k, exclude_ids=[str(paper1.id), str(paper2.id)])
+            else:
+                related_papers = self.get_related_papers_for_pair(paper1, paper2, k=k)
             
-            # Build context
-            context = f"""
-            Paper 1: {paper1.title}
-            Authors: {', '.join(paper1.authors) if isinstance(paper1.authors, list) else paper1.authors}
-            Categories: {paper1.categories}
-            Abstract: {paper1.abstract}
+            if self.passage_table is not None and vector is not None:
+                papers = [paper1, paper2, *related_papers]
+                passages = self.select_passages(vector, [paper.id for paper in papers],
+                                                token_budget or settings.RAG_CONTEXT_TOKEN_BUDGET)
+                labels = ["Paper 1", "Paper 2", *[f"Related Paper {i}" for i in range(1, len(related_papers) + 1)]]
+                sections = [self._format_passages(label, paper, passages[str(paper.id)])
+                            for label, paper in zip(labels, papers)]
+                return "\n\n".join(sections)
             
-            Paper 2: {paper2.title}
-            Authors: {', '.join(paper2.authors) if isinstance(paper2.authors, list) else paper2.authors}
-            Categories: {paper2.categories}
-            Abstract: {paper2.abstract}
-            """
-            
-            # Add related papers for additional context
-            if related_papers:
-                context += "\n\nRelated Papers:\n"
-                for i, paper in enumerate(related_papers, 1):
-                    context += f"""
-                    Related Paper {i}: {paper.title}
-                    Authors: {', '.join(paper.authors) if isinstance(paper.authors, list) else paper.authors}
-                    Categories: {paper.categories}
-                    Abstract: {paper.abstract}
-                    """
-            
-            return context.strip()
+            return self._format_abstracts(paper1, paper2, related_papers)
         
         except Paper.DoesNotExist:
             logger.error(f"One of the papers not found")
@@ -98,4 +180,38 @@ class ContextRetrievalService:
         
         except Exception as e:
             logger.error(f"Error building context: {str(e)}")
-            return ""
\ No newline at end of file
+            return ""
+    
+    def _format_passages(self, label, paper, passages):
+        """Format a paper's header and selected passages."""
+        lines = [f"{label}: {paper.title}", f"Categories: {paper.categories}"]
+        lines += [f"- {passage}" for passage in passages]
+        return "\n".join(lines)
+    
+    def _format_abstracts(self, paper1, paper2, related_papers):
+        """Format the papers with their whole abstracts, used without the passage index."""
+        # Build context
+        context = f"""
+        Paper 1: {paper1.title}
+        Authors: {', '.join(paper1.authors) if isinstance(paper1.authors, list) else paper1.authors}
+        Categories: {paper1.categories}
+        Abstract: {paper1.abstract}
+        
+        Paper 2: {paper2.title}
+        Authors: {', '.join(paper2.authors) if isinstance(paper2.authors, list) else paper2.authors}
+        Categories: {paper2.categories}
+        Abstract: {paper2.abstract}
+        """
+        
+        # Add related papers for additional context
+        if related_papers:
+            context += "\n\nRelated Papers:\n"
+            for i, paper in enumerate(related_papers, 1):
+                context += f"""
+                Related Paper {i}: {paper.title}
+                Authors: {', '.join(paper.authors) if isinstance(paper.authors, list) else paper.authors}
+                Categories: {paper.categories}
+                Abstract: {paper.abstract}
+                """
+        
+        return context.strip()
@@ -1,55 +1,135 @@
 import logging
 import os
 from django.conf import settings
-from core.models import Paper
+from core.models import Paper, Recommendation, RecommendationExplanation
 from .context_service import ContextRetrievalService
+from .generation import get_generation_backend
+from .jobs import GenerationQueueFull, GenerationTimeout, get_generation_queue
 
 logger = logging.getLogger(__name__)
 
+class ExplanationCache:
+    """Persistent store of explanations keyed by (source paper, recommended paper).
+    
+    An explanation is static for a given generator, so rows are keyed by
+    `model_version` as well; bumping EXPLANATION_MODEL_VERSION makes every
+    stored explanation a miss without deleting it.
+    """
+    
+    def __init__(self, model_version=None):
+        """Initialize the cache."""
+        self.model_version = model_version or settings.EXPLANATION_MODEL_VERSION
+    
+    def get(self, source_paper_id, recommended_paper_id):
+        """Return the stored explanation for a pair, or None."""
+        return (RecommendationExplanation.objects
+                .filter(source_paper_id=source_paper_id, recommended_paper_id=recommended_paper_id,
+                        model_version=self.model_version)
+                .values_list('explanation', flat=True)
+                .first())
+    
+    def get_many(self, pairs):
+        """Return {(source id, recommended id): explanation} for the stored pairs among `pairs`."""
+        pairs = {(str(source_id), str(recommended_id)) for source_id, recommended_id in pairs}
+        if not pairs:
+            return {}
+        
+        rows = (RecommendationExplanation.objects
+                .filter(source_paper_id__in={source_id for source_id, _ in pairs},
+                        model_version=self.model_version)
+                .values_list('source_paper_id', 'recommended_paper_id', 'explanation'))
+        return {(source_id, recommended_id): explanation
+                for source_id, recommended_id, explanation in rows
+                if (source_id, recommended_id) in pairs}
+    
+    def set_many(self, explanations):
+        """Store {(source id, recommended id): explanation}, keeping existing rows."""
+        RecommendationExplanation.objects.bulk_create(
+            [RecommendationExplanation(source_paper_id=source_id, recommended_paper_id=recommended_id,
+                                       model_version=self.model_version, explanation=explanation)
+             for (source_id, recommended_id), explanation in explanations.items()],
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+    
+    def prune(self):
+        """Delete explanations stored for other model versions."""
+        deleted, _ = RecommendationExplanation.objects.exclude(model_version=self.model_version).delete()
+        return deleted
+
 class ExplanationService:
-    """Service for generating explanations for recommendations."""
+    """Service for generating explanations for recommendations.
     
-    def __init__(self):
+    The text comes from the configured generation backend (EXPLANATION_BACKEND),
+    which streams it in chunks. Interactive requests run it on the bounded
+    generation queue so slow local models cannot pin request workers.
+    """
+    
+    def __init__(self, model_version=None, backend=None):
         """Initialize the explanation service."""
-        self.context_service = ContextRetrievalService()
+        self.cache = ExplanationCache(model_version)
+        self.backend = backend or get_generation_backend()
+        self._context_service = None
+    
+    @property
+    def context_service(self):
+        """The context retrieval service, created on first use."""
+        if self._context_service is None:
+            self._context_service = ContextRetrievalService()
+        return self._context_service
+    
+    def get_context(self, source_paper, recommended_paper):
+        """Retrieve RAG context for a pair if the backend uses it."""
+        if not self.backend.needs_context:
+            return None
+        return self.context_service.build_context_for_papers(source_paper, recommended_paper)
+    
+    def get_papers(self, source_paper_id, recommended_paper_id):
+        """Fetch both papers with one query, raising Paper.DoesNotExist if either is missing."""
+        source_paper_id, recommended_paper_id = str(source_paper_id), str(recommended_paper_id)
+        papers = Paper.objects.in_bulk([source_paper_id, recommended_paper_id])
+        if source_paper_id not in papers or recommended_paper_id not in papers:
+            raise Paper.DoesNotExist
+        return papers[source_paper_id], papers[recommended_paper_id]
+    
+    def generate_explanation(self, source_paper, recommended_paper):
+        """Build the explanation for a pair of already loaded papers."""
+        context = self.get_context(source_paper, recommended_paper)
+        return self.backend.generate(source_paper, recommended_paper, context=context)
+    
+    def stream_explanation(self, source_paper_id, recommended_paper_id, cancel_event=None):
+        """Yield a freshly generated explanation in chunks and store it once complete."""
+        source_paper, recommended_paper = self.get_papers(source_paper_id, recommended_paper_id)
+        context = self.get_context(source_paper, recommended_paper)
         
-        # In a real production system, you would use a language model here
-        # For now, we'll implement a simple template-based approach
+        chunks = []
+        for chunk in self.backend.stream(source_paper, recommended_paper, context=context,
+                                         cancel_event=cancel_event):
+            chunks.append(chunk)
+            yield chunk
+        
+        if cancel_event is None or not cancel_event.is_set():
+            self.cache.set_many({(source_paper.id, recommended_paper.id): "".join(chunks).strip()})
     
-    def explain_recommendation(self, source_paper_id, recommended_paper_id):
-        """Generate an explanation for why a paper is recommended."""
+    def explain_recommendation(self, source_paper_id, recommended_paper_id, check_cache=True):
+        """Generate an explanation for why a paper is recommended, reusing the stored one if present.
+        
+        Callers that have already looked the pair up in the cache pass
+        `check_cache=False` to skip the second lookup. Raises
+        GenerationQueueFull or GenerationTimeout when the generation queue is
+        saturated or the backend is too slow.
+        """
+        source_paper_id, recommended_paper_id = str(source_paper_id), str(recommended_paper_id)
         try:
-            # Get papers
-            source_paper = Paper.objects.get(id=source_paper_id)
-            recommended_paper = Paper.objects.get(id=recommended_paper_id)
+            if check_cache:
+                explanation = self.cache.get(source_paper_id, recommended_paper_id)
+                if explanation is not None:
+                    return explanation
             
-            # Build explanation based on shared categories and content
-            shared_categories = []
-            if hasattr(source_paper, 'categories') and hasattr(recommended_paper, 'categories'):
-                source_categories = source_paper.categories.split() if isinstance(source_paper.categories, str) else source_paper.categories
-                recommended_categories = recommended_paper.categories.split() if isinstance(recommended_paper.categories, str) else recommended_paper.categories
-                
-                if isinstance(source_categories, list) and isinstance(recommended_categories, list):
-                    shared_categories = [cat for cat in source_categories if cat in recommended_categories]
-            
-            explanation = f"""
-            This paper is recommended because it shares relevant research themes with "{source_paper.title}".
-            """
-            
-            if shared_categories:
-                explanation += f"\n\nBoth papers belong to the {', '.join(shared_categories)} {'category' if len(shared_categories) == 1 else 'categories'}."
-            
-            explanation += f"""
-            
-            The recommended paper explores {recommended_paper.title}, which appears to be relevant to your interest in {source_paper.title}.
-            
-            Both papers discuss similar concepts and methodologies that might be valuable for your research.
-            """
-            
-            # In a production system, we would use a language model to generate a more specific explanation
-            # based on the context retrieved from the context service
-            
-            return explanation.strip()
+            return get_generation_queue().run(self.stream_explanation, source_paper_id, recommended_paper_id).strip()
+        
+        except (GenerationQueueFull, GenerationTimeout):
+            raise
         
         except Paper.DoesNotExist:
             logger.error("One of the papers not found")
@@ -57,4 +137,53 @@ class ExplanationService:
         
         except Exception as e:
             logger.error(f"Error generating explanation: {str(e)}")
-            return "An error occurred while generating the explanation."
\ No newline at end of file
+            return "An error occurred while generating the explanation."
+    
+    def precompute_explanations(self, source_paper_ids=None, top_k=10, batch_size=500):
+        """Generate and store explanations for each paper's top-k stored recommendations.
+        
+        Pairs already stored for the current model version are skipped.
+        Returns the number of explanations generated.
+        """
+        sources = Recommendation.objects.order_by('source_paper_id').values_list('source_paper_id', flat=True).distinct()
+        if source_paper_ids is not None:
+            sources = sources.filter(source_paper_id__in=list(source_paper_ids))
+        
+        generated = 0
+        batch = []
+        for source_id in sources.iterator(chunk_size=batch_size):
+            batch.append(source_id)
+            if len(batch) >= batch_size:
+                generated += self._precompute_batch(batch, top_k)
+                batch = []
+        if batch:
+            generated += self._precompute_batch(batch, top_k)
+        
+        logger.info(f"Generated {generated} explanations for model version {self.cache.model_version}")
+        return generated
+    
+    def _precompute_batch(self, source_ids, top_k):
+        """Generate the missing explanations for a batch of source papers."""
+        recommendations = (Recommendation.objects
+                           .filter(source_paper_id__in=source_ids)
+                           .select_related('source_paper', 'recommended_paper')
+                           .order_by('source_paper_id', '-similarity_score'))
+        
+        # Keep each source paper's top-k pairs
+        top = {}
+        for recommendation in recommendations:
+            pairs = top.setdefault(recommendation.source_paper_id, {})
+            if len(pairs) < top_k:
+                pairs[recommendation.recommended_paper_id] = recommendation
+        
+        pairs = {(source_id, recommended_id): recommendation
+                 for source_id, rows in top.items() for recommended_id, recommendation in rows.items()}
+        stored = self.cache.get_many(pairs)
+        
+        explanations = {
+            pair: self.generate_explanation(recommendation.source_paper, recommendation.recommended_paper)
+            for pair, recommendation in pairs.items()
+            if pair not in stored
+        }
+        self.cache.set_many(explanations)
+        return len(explanations)
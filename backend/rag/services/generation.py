@@ -0,0 +1,165 @@
+import re
+import threading
+from django.conf import settings
+from django.utils.module_loading import import_string
+from .term_index import get_term_index
+import logging
+
+logger = logging.getLogger(__name__)
+
+CHUNK_PATTERN = re.compile(r"\S+\s*|\s+")
+
+
+class GenerationBackend:
+    """Interface for the text generator behind recommendation explanations.
+
+    Backends stream an explanation for a (source, recommended) paper pair as
+    text chunks. `needs_context` tells the explanation service whether to
+    retrieve RAG context before generating.
+    """
+
+    needs_context = True
+    shared_term_count = 5
+
+    def shared_terms(self, source_paper, recommended_paper):
+        """Return the highest-weighted TF-IDF terms the two papers share, or [] without a term index."""
+        term_index = get_term_index()
+        if term_index is None:
+            return []
+        try:
+            return term_index.shared_terms(source_paper.id, recommended_paper.id, top_n=self.shared_term_count)
+        except Exception as e:
+            logger.error(f"Error looking up shared terms: {str(e)}")
+            return []
+
+    def build_prompt(self, source_paper, recommended_paper, context=None):
+        """Build the instruction prompt for a paper pair."""
+        prompt = (
+            "Explain in a few sentences why a reader of the first paper would find the second paper relevant. "
+            "Point out shared problems, methods or findings.\n\n"
+        )
+        if context:
+            prompt += f"{context}\n\n"
+        else:
+            prompt += (f"Paper 1: {source_paper.title}\nAbstract: {source_paper.abstract}\n\n"
+                       f"Paper 2: {recommended_paper.title}\nAbstract: {recommended_paper.abstract}\n\n")
+        terms = self.shared_terms(source_paper, recommended_paper)
+        if terms:
+            prompt += f"Shared key terms: {', '.join(terms)}\n\n"
+        return prompt + "Explanation:"
+
+    def stream(self, source_paper, recommended_paper, context=None, cancel_event=None):
+        """Yield the explanation as text chunks; stop early once `cancel_event` is set."""
+        raise NotImplementedError
+
+    def generate(self, source_paper, recommended_paper, context=None):
+        """Return the whole explanation."""
+        return "".join(self.stream(source_paper, recommended_paper, context=context)).strip()
+
+
+class TemplateBackend(GenerationBackend):
+    """Deterministic stand-in generator built from the papers' titles, categories and shared terms.
+
+    It needs no model or context, so it is fast and reproducible in tests
+    while still streaming its output word by word like a real generator.
+    """
+
+    needs_context = False
+
+    def render(self, source_paper, recommended_paper):
+        """Build the templated explanation."""
+        # Build explanation based on shared categories and content
+        shared_categories = []
+        if hasattr(source_paper, 'categories') and hasattr(recommended_paper, 'categories'):
+            source_categories = source_paper.categories.split() if isinstance(source_paper.categories, str) else source_paper.categories
+            recommended_categories = recommended_paper.categories.split() if isinstance(recommended_paper.categories, str) else recommended_paper.categories
+
+            if isinstance(source_categories, list) and isinstance(recommended_categories, list):
+                shared_categories = [cat for cat in source_categories if cat in recommended_categories]
+
+        explanation = f"""
+            This paper is recommended because it shares relevant research themes with "{source_paper.title}".
+            """
+
+        if shared_categories:
+            explanation += f"\n\nBoth papers belong to the {', '.join(shared_categories)} {'category' if len(shared_categories) == 1 else 'categories'}."
+
+        shared_terms = self.shared_terms(source_paper, recommended_paper)
+        if shared_terms:
+            explanation += f"\n\nKey concepts shared by both papers: {', '.join(shared_terms)}."
+
+        explanation += f"""
+            
+            The recommended paper explores {recommended_paper.title}, which appears to be relevant to your interest in {source_paper.title}.
+            
+            Both papers discuss similar concepts and methodologies that might be valuable for your research.
+            """
+
+        return explanation.strip()
+
+    def stream(self, source_paper, recommended_paper, context=None, cancel_event=None):
+        """Yield the templated explanation one word at a time."""
+        for chunk in CHUNK_PATTERN.findall(self.render(source_paper, recommended_paper)):
+            if cancel_event is not None and cancel_event.is_set():
+                return
+            yield chunk
+
+
+class TransformersBackend(GenerationBackend):
+    """Local Hugging Face causal language model, streamed token by token.
+
+    Requires the optional `transformers` and `torch` packages. The model is
+    loaded once per process on first use.
+    """
+
+    _models = {}
+    _lock = threading.Lock()
+
+    def __init__(self, model_name=None, max_new_tokens=None):
+        """Initialize the backend."""
+        self.model_name = model_name or settings.EXPLANATION_LLM_MODEL
+        self.max_new_tokens = max_new_tokens or settings.EXPLANATION_MAX_NEW_TOKENS
+
+    def _load(self):
+        """Load the tokenizer and model, once per process."""
+        loaded = self._models.get(self.model_name)
+        if loaded is None:
+            with self._lock:
+                loaded = self._models.get(self.model_name)
+                if loaded is None:
+                    from transformers import AutoModelForCausalLM, AutoTokenizer
+
+                    logger.info(f"Loading generation model {self.model_name}")
+                    loaded = (AutoTokenizer.from_pretrained(self.model_name),
+                              AutoModelForCausalLM.from_pretrained(self.model_name))
+                    self._models[self.model_name] = loaded
+        return loaded
+
+    def stream(self, source_paper, recommended_paper, context=None, cancel_event=None):
+        """Generate in a background thread and yield decoded tokens as they arrive."""
+        from transformers import StoppingCriteria, StoppingCriteriaList, TextIteratorStreamer
+
+        class Cancelled(StoppingCriteria):
+            def __call__(self, input_ids, scores, **kwargs):
+                return cancel_event is not None and cancel_event.is_set()
+
+        tokenizer, model = self._load()
+        inputs = tokenizer(self.build_prompt(source_paper, recommended_paper, context), return_tensors="pt")
+        streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True)
+        thread = threading.Thread(target=model.generate, daemon=True, kwargs={
+            **inputs,
+            "streamer": streamer,
+            "max_new_tokens": self.max_new_tokens,
+            "do_sample": False,
+            "stopping_criteria": StoppingCriteriaList([Cancelled()]),
+        })
+        thread.start()
+        for chunk in streamer:
+            if chunk:
+                yield chunk
+        thread.join()
+
+
+def get_generation_backend():
+    """Return an instance of the backend named by the EXPLANATION_BACKEND setting."""
+    return import_string(settings.EXPLANATION_BACKEND)()
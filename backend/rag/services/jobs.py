@@ -0,0 +1,171 @@
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections
+import logging
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+class GenerationQueueFull(Exception):
+    """Raised when the generation queue has no room for another job."""
+
+
+class GenerationTimeout(Exception):
+    """Raised when a generation job runs past its deadline."""
+
+
+class GenerationJob:
+    """Handle on a streamed generation running on the worker pool.
+
+    The worker pushes text chunks into a channel that the request side reads
+    with `__iter__` (sync views) or `__aiter__` (async views). Chunks arrive
+    through an asyncio queue when the job was submitted from an event loop,
+    so waiting for tokens never blocks a thread there. Reading past the
+    deadline cancels the job and raises GenerationTimeout.
+    """
+
+    def __init__(self, timeout, loop=None):
+        """Initialize the job."""
+        self.deadline = time.monotonic() + timeout
+        self.cancel_event = threading.Event()
+        self.loop = loop
+        self._chunks = asyncio.Queue() if loop is not None else queue.Queue()
+
+    def put(self, item):
+        """Deliver a chunk, the end marker or an exception from the worker thread."""
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._chunks.put_nowait, item)
+        else:
+            self._chunks.put(item)
+
+    def cancel(self):
+        """Ask the worker to stop generating."""
+        self.cancel_event.set()
+
+    def _remaining(self):
+        """Return the seconds left before the deadline, cancelling the job once it has passed."""
+        remaining = self.deadline - time.monotonic()
+        if remaining <= 0:
+            self.cancel()
+            raise GenerationTimeout("Generation timed out")
+        return remaining
+
+    def _unwrap(self, item):
+        """Return the chunk in a channel item, None at the end, or raise the worker's exception."""
+        if item is _DONE:
+            return None
+        if isinstance(item, BaseException):
+            raise item
+        return item
+
+    def __iter__(self):
+        try:
+            while True:
+                try:
+                    item = self._chunks.get(timeout=self._remaining())
+                except queue.Empty:
+                    continue
+                chunk = self._unwrap(item)
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            self.cancel()
+
+    async def __aiter__(self):
+        try:
+            while True:
+                try:
+                    item = await asyncio.wait_for(self._chunks.get(), timeout=self._remaining())
+                except asyncio.TimeoutError:
+                    continue
+                chunk = self._unwrap(item)
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            self.cancel()
+
+
+class GenerationQueue:
+    """Bounded worker pool for slow generation calls.
+
+    At most `max_workers` generations run at once and at most `max_pending`
+    more wait for a worker; further submissions raise GenerationQueueFull
+    instead of piling up behind a slow model. Every job has a deadline.
+    """
+
+    def __init__(self, max_workers=2, max_pending=8, timeout=30.0):
+        """Initialize the queue."""
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="generation")
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+
+    def _acquire(self):
+        """Reserve a slot for a job or raise GenerationQueueFull."""
+        if not self._slots.acquire(blocking=False):
+            raise GenerationQueueFull("Too many explanations are being generated, try again shortly")
+
+    def _run(self, job, fn, args, kwargs):
+        """Worker body: forward the chunks of `fn(*args, cancel_event=...)` to the job."""
+        try:
+            if job.cancel_event.is_set():
+                return
+            for chunk in fn(*args, cancel_event=job.cancel_event, **kwargs):
+                if job.cancel_event.is_set():
+                    return
+                if chunk:
+                    job.put(chunk)
+            job.put(_DONE)
+        except Exception as e:
+            logger.warning(f"Generation job failed: {e.__class__.__name__} {str(e)}")
+            job.put(e)
+        finally:
+            self._slots.release()
+            close_old_connections()
+
+    def stream(self, fn, *args, timeout=None, loop=None, **kwargs):
+        """Run a chunk generator on the pool and return its GenerationJob.
+
+        `fn` is called as `fn(*args, cancel_event=event, **kwargs)` and must
+        yield text chunks. Pass the running event loop as `loop` when the
+        job is consumed with `async for`.
+        """
+        self._acquire()
+        job = GenerationJob(timeout or self.timeout, loop=loop)
+        try:
+            self._executor.submit(self._run, job, fn, args, kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+        return job
+
+    def run(self, fn, *args, timeout=None, **kwargs):
+        """Run a chunk generator on the pool and wait for the joined result."""
+        return "".join(self.stream(fn, *args, timeout=timeout, **kwargs))
+
+
+_generation_queue = None
+_generation_queue_lock = threading.Lock()
+
+
+def get_generation_queue():
+    """Return the process-wide generation queue."""
+    global _generation_queue
+    if _generation_queue is None:
+        with _generation_queue_lock:
+            if _generation_queue is None:
+                _generation_queue = GenerationQueue(
+                    max_workers=settings.EXPLANATION_MAX_CONCURRENCY,
+                    max_pending=settings.EXPLANATION_MAX_PENDING,
+                    timeout=settings.EXPLANATION_TIMEOUT,
+                )
+    return _generation_queue
@@ -0,0 +1,85 @@
+import os
+import threading
+import numpy as np
+from django.conf import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class TermIndex:
+    """Memory-mapped TF-IDF term matrix built by the data pipeline.
+
+    The CSR arrays are opened with `mmap_mode='r'`, so worker processes share
+    the page cache instead of each loading a copy. Rows are sorted by paper
+    id and each row's term indices are sorted, so the shared terms of a pair
+    are one binary search per paper and one sorted intersection.
+    """
+
+    DATA_FILE = "data.npy"
+    INDICES_FILE = "indices.npy"
+    INDPTR_FILE = "indptr.npy"
+    VOCAB_FILE = "vocab.npy"
+    IDS_FILE = "ids.npy"
+    META_FILE = "meta.json"
+
+    def __init__(self, directory):
+        """Memory-map the arrays saved in `directory`."""
+        self.directory = directory
+        self.data = np.load(os.path.join(directory, self.DATA_FILE), mmap_mode='r')
+        self.indices = np.load(os.path.join(directory, self.INDICES_FILE), mmap_mode='r')
+        self.indptr = np.load(os.path.join(directory, self.INDPTR_FILE), mmap_mode='r')
+        self.vocab = np.load(os.path.join(directory, self.VOCAB_FILE), mmap_mode='r')
+        self.ids = np.load(os.path.join(directory, self.IDS_FILE), mmap_mode='r')
+
+    def row(self, paper_id):
+        """Return (term indices, weights) for a paper, or None if it is not indexed."""
+        paper_id = str(paper_id)
+        position = int(np.searchsorted(self.ids, paper_id))
+        if position >= len(self.ids) or self.ids[position] != paper_id:
+            return None
+        start, end = self.indptr[position], self.indptr[position + 1]
+        return self.indices[start:end], self.data[start:end]
+
+    def shared_terms(self, paper_id1, paper_id2, top_n=5):
+        """Return the top shared terms of two papers, ranked by the product of their weights."""
+        row1 = self.row(paper_id1)
+        row2 = self.row(paper_id2)
+        if row1 is None or row2 is None:
+            return []
+
+        common, i1, i2 = np.intersect1d(row1[0], row2[0], assume_unique=True, return_indices=True)
+        if not len(common):
+            return []
+
+        scores = row1[1][i1] * row2[1][i2]
+        best = np.argsort(-scores, kind='stable')[:top_n]
+        return [str(self.vocab[common[i]]) for i in best]
+
+
+_term_index = None
+_term_index_mtime = None
+_term_index_lock = threading.Lock()
+
+
+def get_term_index():
+    """Return the memory-mapped term index, reopening it when the pipeline rewrites it.
+
+    Returns None if no term index has been built.
+    """
+    global _term_index, _term_index_mtime
+    meta_path = os.path.join(settings.TERM_INDEX_DIR, TermIndex.META_FILE)
+    try:
+        mtime = os.path.getmtime(meta_path)
+    except OSError:
+        return None
+
+    if _term_index is None or mtime != _term_index_mtime:
+        with _term_index_lock:
+            if _term_index is None or mtime != _term_index_mtime:
+                try:
+                    _term_index = TermIndex(settings.TERM_INDEX_DIR)
+                    _term_index_mtime = mtime
+                except Exception as e:
+                    logger.error(f"Error loading term index: {str(e)}")
+    return _term_index
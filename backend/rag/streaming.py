@@ -0,0 +1,67 @@
+import json
+from core.models import Paper
+from .services.jobs import GenerationTimeout
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Server-sent events for streamed explanations: one `delta` event per chunk,
+# then `done` with the full text, or `error` if generation failed.
+
+SSE_HEADERS = {
+    'Cache-Control': 'no-cache',
+    'X-Accel-Buffering': 'no',  # stop nginx from buffering the stream
+}
+
+
+def sse_event(event, data):
+    """Format one server-sent event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def cached_events(explanation):
+    """Events for an explanation served from the store."""
+    return [sse_event('delta', {'text': explanation}),
+            sse_event('done', {'explanation': explanation, 'cached': True})]
+
+
+async def async_cached_events(explanation):
+    """Events for an explanation served from the store, as an async iterator."""
+    for event in cached_events(explanation):
+        yield event
+
+
+def _error_event(error):
+    """Event describing why a generation job failed."""
+    if isinstance(error, GenerationTimeout):
+        return sse_event('error', {'error': 'Generation timed out'})
+    if isinstance(error, Paper.DoesNotExist):
+        return sse_event('error', {'error': 'One of the papers was not found'})
+    logger.error(f"Error streaming explanation: {str(error)}")
+    return sse_event('error', {'error': 'An error occurred while generating the explanation'})
+
+
+def job_events(job):
+    """Events for a generation job, read synchronously."""
+    chunks = []
+    try:
+        for chunk in job:
+            chunks.append(chunk)
+            yield sse_event('delta', {'text': chunk})
+    except Exception as e:
+        yield _error_event(e)
+        return
+    yield sse_event('done', {'explanation': "".join(chunks).strip(), 'cached': False})
+
+
+async def async_job_events(job):
+    """Events for a generation job, awaited without blocking the event loop."""
+    chunks = []
+    try:
+        async for chunk in job:
+            chunks.append(chunk)
+            yield sse_event('delta', {'text': chunk})
+    except Exception as e:
+        yield _error_event(e)
+        return
+    yield sse_event('done', {'explanation': "".join(chunks).strip(), 'cached': False})
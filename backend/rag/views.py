@@ -1,15 +1,26 @@
+from django.http import StreamingHttpResponse
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from core.models import Paper
-from .services.explanation_service import ExplanationService
+from .services.explanation_service import ExplanationCache, ExplanationService
+from .services.jobs import GenerationQueueFull, GenerationTimeout, get_generation_queue
+from .streaming import SSE_HEADERS, cached_events, job_events
 
 class RAGViewSet(viewsets.ViewSet):
     """ViewSet for RAG functionality."""
     
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.explanation_service = ExplanationService()
+        self.explanation_cache = ExplanationCache()
+        self._explanation_service = None
+    
+    @property
+    def explanation_service(self):
+        """The explanation service, only constructed when an explanation has to be generated."""
+        if self._explanation_service is None:
+            self._explanation_service = ExplanationService(model_version=self.explanation_cache.model_version)
+        return self._explanation_service
     
     @action(detail=False, methods=['post'])
     def explain_recommendation(self, request):
@@ -23,9 +34,48 @@ class RAGViewSet(viewsets.ViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        explanation = self.explanation_service.explain_recommendation(
-            source_paper_id=source_paper_id,
-            recommended_paper_id=recommended_paper_id
-        )
+        # Serve the stored explanation for this pair when there is one
+        explanation = self.explanation_cache.get(source_paper_id, recommended_paper_id)
+        cached = explanation is not None
+        if not cached:
+            try:
+                explanation = self.explanation_service.explain_recommendation(
+                    source_paper_id=source_paper_id,
+                    recommended_paper_id=recommended_paper_id,
+                    check_cache=False
+                )
+            except GenerationQueueFull as e:
+                return Response({"error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                headers={"Retry-After": "5"})
+            except GenerationTimeout:
+                return Response({"error": "Generating the explanation timed out"},
+                                status=status.HTTP_504_GATEWAY_TIMEOUT)
+        
+        return Response({"explanation": explanation, "cached": cached})
+    
+    @action(detail=False, methods=['get', 'post'])
+    def explain_recommendation_stream(self, request):
+        """Stream the explanation as server-sent events while it is generated."""
+        params = request.data if request.method == 'POST' else request.query_params
+        source_paper_id = params.get('source_paper_id')
+        recommended_paper_id = params.get('recommended_paper_id')
+        
+        if not source_paper_id or not recommended_paper_id:
+            return Response(
+                {"error": "Both source_paper_id and recommended_paper_id are required"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        explanation = self.explanation_cache.get(source_paper_id, recommended_paper_id)
+        if explanation is not None:
+            events = cached_events(explanation)
+        else:
+            try:
+                events = job_events(get_generation_queue().stream(
+                    self.explanation_service.stream_explanation, source_paper_id, recommended_paper_id
+                ))
+            except GenerationQueueFull as e:
+                return Response({"error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                headers={"Retry-After": "5"})
         
-        return Response({"explanation": explanation})
\ No newline at end of file
+        return StreamingHttpResponse(events, content_type='text/event-stream', headers=SSE_HEADERS)
\ No newline at end of file
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class RecommendationConfig(AppConfig):
+    name = 'recommendation'
+
+    def ready(self):
+        # Registers the result cache's LanceDB table change listener in every process
+        from . import result_cache  # noqa: F401
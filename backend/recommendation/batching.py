@@ -0,0 +1,141 @@
+import asyncio
+import json
+import weakref
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from .services import RecommendationService
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class QueryCoalescer:
+    """Coalesces concurrent searches into micro-batches.
+
+    Requests arriving within a short window are encoded with a single
+    transformer call in a worker thread, searched against LanceDB together,
+    and each caller gets back its own list of (paper id, distance) pairs.
+    A coalescer belongs to one event loop and holds one recommendation
+    service for its batches.
+    """
+
+    def __init__(self, model_name="allenai-specter", window_ms=5, max_batch_size=32):
+        """Initialize the coalescer."""
+        self.model_name = model_name
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self._pending = []
+        self._flush_handle = None
+        self._tasks = set()
+        self._service = None
+
+    @property
+    def service(self):
+        """Return the recommendation service, created on first use."""
+        if self._service is None:
+            self._service = RecommendationService(model_name=self.model_name)
+        return self._service
+
+    async def search(self, text, top_k=10, filters=None, is_query=True, exclude_id=None):
+        """Queue a search and wait for its batch to complete.
+
+        `is_query` texts go through the query embedding cache; other texts
+        (such as paper abstracts) are always encoded.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append({
+            "text": text,
+            "top_k": top_k,
+            "filters": filters or {},
+            "is_query": is_query,
+            "exclude_id": exclude_id,
+            "future": future,
+        })
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.window, self._flush)
+
+        return await future
+
+    def _flush(self):
+        """Hand the pending requests to a worker thread as one batch."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        """Run a batch and resolve the waiting futures."""
+        try:
+            results = await sync_to_async(self._search_batch, thread_sensitive=False)(batch)
+        except Exception as e:
+            logger.error(f"Error running search batch: {str(e)}")
+            for request in batch:
+                if not request["future"].done():
+                    request["future"].set_exception(e)
+            return
+
+        for request, result in zip(batch, results):
+            if not request["future"].done():
+                request["future"].set_result(result)
+
+    def _search_batch(self, batch):
+        """Encode every text in the batch at once, then search per filter group."""
+        service = self.service
+
+        query_positions = [i for i, request in enumerate(batch) if request["is_query"]]
+        text_positions = [i for i, request in enumerate(batch) if not request["is_query"]]
+
+        embeddings = [None] * len(batch)
+        query_embeddings = service.embed_queries([batch[i]["text"] for i in query_positions])
+        text_embeddings = service.encode_texts([batch[i]["text"] for i in text_positions])
+        for i, embedding in zip(query_positions, query_embeddings):
+            embeddings[i] = embedding
+        for i, embedding in zip(text_positions, text_embeddings):
+            embeddings[i] = embedding
+
+        # Requests with the same filters share one multi-vector search
+        groups = {}
+        for i, request in enumerate(batch):
+            groups.setdefault(json.dumps(request["filters"], sort_keys=True), []).append(i)
+
+        results = [None] * len(batch)
+        for positions in groups.values():
+            filters = batch[positions[0]]["filters"]
+            limit = max(batch[i]["top_k"] + (1 if batch[i]["exclude_id"] else 0) for i in positions)
+            frames = service.search_embeddings([embeddings[i] for i in positions], top_k=limit, filters=filters)
+
+            for i, frame in zip(positions, frames):
+                request = batch[i]
+                rows = [
+                    (str(paper_id), float(distance))
+                    for paper_id, distance in zip(frame['id'], frame['_distance'])
+                    if str(paper_id) != request["exclude_id"]
+                ]
+                results[i] = rows[:request["top_k"]]
+
+        return results
+
+
+_coalescers = weakref.WeakKeyDictionary()
+
+
+def get_query_coalescer(model_name="allenai-specter"):
+    """Return the coalescer for the running event loop and model."""
+    loop = asyncio.get_running_loop()
+    per_loop = _coalescers.setdefault(loop, {})
+    if model_name not in per_loop:
+        per_loop[model_name] = QueryCoalescer(
+            model_name=model_name,
+            window_ms=settings.SEARCH_BATCH_WINDOW_MS,
+            max_batch_size=settings.SEARCH_BATCH_MAX_SIZE,
+        )
+    return per_loop[model_name]
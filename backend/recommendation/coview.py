@@ -0,0 +1,242 @@
+import json
+import os
+import threading
+from datetime import timedelta
+import numpy as np
+import scipy.sparse as sp
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from core.models import PaperView
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class CoViewModel:
+    """Item-item "viewers also viewed" model built from PaperView sessions.
+
+    `matrix[i, j]` counts the sessions in which both paper i and paper j were
+    viewed, stored as a symmetric SciPy CSR matrix. `item_counts[i]` counts the
+    sessions that viewed paper i, used to normalize co-view counts into a
+    cosine score. New events are folded in incrementally from a timestamp
+    watermark. Views younger than `settle_seconds` are left for the next
+    update, since write-behind logging can insert them slightly out of order.
+    """
+
+    MATRIX_FILE = "coview_matrix.npz"
+    IDS_FILE = "coview_ids.npy"
+    COUNTS_FILE = "coview_item_counts.npy"
+    META_FILE = "coview_meta.json"
+
+    def __init__(self, max_session_items=50, excluded_sessions=('anonymous',), settle_seconds=60):
+        """Initialize an empty model.
+
+        Views logged under the shared 'anonymous' key predate per-caller
+        sessions and mix every visitor together, so they are excluded.
+        """
+        self.max_session_items = max_session_items
+        self.excluded_sessions = set(excluded_sessions)
+        self.settle_seconds = settle_seconds
+        self.paper_ids = []
+        self.index = {}
+        self.matrix = sp.csr_matrix((0, 0), dtype=np.float32)
+        self.item_counts = np.zeros(0, dtype=np.float32)
+        self.watermark = None
+
+    def _views(self):
+        """Return the PaperView queryset the model is built from."""
+        return PaperView.objects.exclude(session_id__in=self.excluded_sessions)
+
+    def _ensure_ids(self, paper_ids):
+        """Add unseen paper ids to the index, growing the matrix to match."""
+        for paper_id in paper_ids:
+            if paper_id not in self.index:
+                self.index[paper_id] = len(self.paper_ids)
+                self.paper_ids.append(paper_id)
+
+        size = len(self.paper_ids)
+        if self.matrix.shape[0] != size:
+            self.matrix.resize((size, size))
+            self.item_counts = np.pad(self.item_counts, (0, size - len(self.item_counts)))
+
+    def _pair_entries(self, new_items, old_items):
+        """Return (rows, cols) for every co-view pair a session gains.
+
+        Pairs among `new_items`, and between `new_items` and `old_items`, are
+        returned in both directions.
+        """
+        new_idx = np.array([self.index[p] for p in new_items], dtype=np.int64)
+        old_idx = np.array([self.index[p] for p in old_items], dtype=np.int64)
+
+        # Pairs among the new items (both directions, no diagonal)
+        rows, cols = np.meshgrid(new_idx, new_idx, indexing='ij')
+        off_diagonal = rows != cols
+        rows, cols = [rows[off_diagonal]], [cols[off_diagonal]]
+
+        # Pairs between new and previously seen items, in both directions
+        if len(old_idx):
+            new_grid, old_grid = np.meshgrid(new_idx, old_idx, indexing='ij')
+            rows += [new_grid.ravel(), old_grid.ravel()]
+            cols += [old_grid.ravel(), new_grid.ravel()]
+
+        return np.concatenate(rows), np.concatenate(cols)
+
+    def _apply_sessions(self, sessions):
+        """Add co-view counts for {session: (new items, old items)}."""
+        all_rows, all_cols = [], []
+        counted = []
+        for new_items, old_items in sessions.values():
+            if not new_items:
+                continue
+            rows, cols = self._pair_entries(new_items, old_items)
+            all_rows.append(rows)
+            all_cols.append(cols)
+            counted.extend(self.index[p] for p in new_items)
+
+        if counted:
+            np.add.at(self.item_counts, np.array(counted, dtype=np.int64), 1)
+
+        if all_rows:
+            rows = np.concatenate(all_rows)
+            cols = np.concatenate(all_cols)
+            size = len(self.paper_ids)
+            delta = sp.coo_matrix((np.ones(len(rows), dtype=np.float32), (rows, cols)), shape=(size, size))
+            self.matrix = (self.matrix + delta.tocsr()).tocsr()
+
+    def _group_sessions(self, rows):
+        """Group (session id, paper id) rows into per-session lists of distinct papers."""
+        sessions = {}
+        for session_id, paper_id in rows:
+            items = sessions.setdefault(session_id, {})
+            if len(items) < self.max_session_items:
+                items[paper_id] = None
+        return {session_id: list(items) for session_id, items in sessions.items()}
+
+    def _cutoff(self):
+        """Return the newest timestamp that is safe to process."""
+        return timezone.now() - timedelta(seconds=self.settle_seconds)
+
+    def build(self):
+        """Rebuild the model from every stored view."""
+        self.__init__(self.max_session_items, self.excluded_sessions, self.settle_seconds)
+
+        cutoff = self._cutoff()
+        views = self._views().filter(timestamp__lte=cutoff).order_by('session_id', 'timestamp')
+        sessions = self._group_sessions(views.values_list('session_id', 'paper_id').iterator(chunk_size=10000))
+
+        self._ensure_ids({paper_id for items in sessions.values() for paper_id in items})
+        self._apply_sessions({session_id: (items, []) for session_id, items in sessions.items()})
+        self.watermark = cutoff
+        logger.info(f"Built co-view model with {len(self.paper_ids)} papers and {self.matrix.nnz} entries")
+        return self
+
+    def update(self):
+        """Fold views recorded after the watermark into the model."""
+        if self.watermark is None:
+            return self.build()
+
+        cutoff = self._cutoff()
+        new_views = (self._views()
+                     .filter(timestamp__gt=self.watermark, timestamp__lte=cutoff)
+                     .order_by('session_id', 'timestamp'))
+
+        new_sessions = self._group_sessions(new_views.values_list('session_id', 'paper_id').iterator(chunk_size=10000))
+        old_sessions = {}
+        session_ids = list(new_sessions)
+        for start in range(0, len(session_ids), 500):
+            old_sessions.update(self._group_sessions(
+                self._views()
+                .filter(session_id__in=session_ids[start:start + 500], timestamp__lte=self.watermark)
+                .order_by('session_id', 'timestamp')
+                .values_list('session_id', 'paper_id')
+                .iterator(chunk_size=10000)
+            ))
+
+        sessions = {}
+        for session_id, items in new_sessions.items():
+            old_items = old_sessions.get(session_id, [])
+            room = max(self.max_session_items - len(old_items), 0)
+            seen = set(old_items)
+            sessions[session_id] = ([p for p in items if p not in seen][:room], old_items)
+
+        self._ensure_ids({p for new_items, old_items in sessions.values() for p in (*new_items, *old_items)})
+        self._apply_sessions(sessions)
+        self.watermark = cutoff
+        logger.info(f"Updated co-view model from {len(new_sessions)} sessions")
+        return self
+
+    def scores(self, paper_id, candidate_ids=None):
+        """Return cosine-normalized co-view scores between a paper and other papers."""
+        row_index = self.index.get(str(paper_id))
+        if row_index is None:
+            return {}
+
+        row = self.matrix.getrow(row_index)
+        norms = np.sqrt(self.item_counts[row_index] * self.item_counts[row.indices])
+        values = row.data / np.where(norms == 0, 1, norms)
+        scores = {self.paper_ids[i]: float(v) for i, v in zip(row.indices, values)}
+
+        if candidate_ids is not None:
+            return {pid: scores.get(str(pid), 0.0) for pid in candidate_ids}
+        return scores
+
+    def has_coviews(self, paper_id):
+        """Return whether any session viewed the paper together with another paper."""
+        row_index = self.index.get(str(paper_id))
+        return row_index is not None and self.matrix.indptr[row_index + 1] > self.matrix.indptr[row_index]
+
+    def top_related(self, paper_id, k=10):
+        """Return the k papers most often co-viewed with a paper as (id, score) pairs."""
+        scores = self.scores(paper_id)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def save(self, directory):
+        """Persist the model as a compressed CSR matrix plus id and count arrays."""
+        os.makedirs(directory, exist_ok=True)
+        sp.save_npz(os.path.join(directory, self.MATRIX_FILE), self.matrix, compressed=True)
+        np.save(os.path.join(directory, self.IDS_FILE), np.array(self.paper_ids, dtype=str))
+        np.save(os.path.join(directory, self.COUNTS_FILE), self.item_counts)
+        with open(os.path.join(directory, self.META_FILE), 'w') as f:
+            json.dump({"watermark": self.watermark.isoformat() if self.watermark else None}, f)
+
+    @classmethod
+    def load(cls, directory, **kwargs):
+        """Load a persisted model."""
+        model = cls(**kwargs)
+        model.matrix = sp.load_npz(os.path.join(directory, cls.MATRIX_FILE)).tocsr().astype(np.float32)
+        model.paper_ids = np.load(os.path.join(directory, cls.IDS_FILE)).tolist()
+        model.index = {paper_id: i for i, paper_id in enumerate(model.paper_ids)}
+        model.item_counts = np.load(os.path.join(directory, cls.COUNTS_FILE)).astype(np.float32)
+        with open(os.path.join(directory, cls.META_FILE)) as f:
+            watermark = json.load(f).get("watermark")
+        model.watermark = parse_datetime(watermark) if watermark else None
+        return model
+
+
+_coview_model = None
+_coview_model_mtime = None
+_coview_model_lock = threading.Lock()
+
+
+def get_coview_model():
+    """Return the persisted co-view model, reloading it when the files change.
+
+    Returns None if no model has been built yet.
+    """
+    global _coview_model, _coview_model_mtime
+    meta_path = os.path.join(settings.COVIEW_MODEL_DIR, CoViewModel.META_FILE)
+    try:
+        mtime = os.path.getmtime(meta_path)
+    except OSError:
+        return None
+
+    if _coview_model is None or mtime != _coview_model_mtime:
+        with _coview_model_lock:
+            if _coview_model is None or mtime != _coview_model_mtime:
+                try:
+                    _coview_model = CoViewModel.load(settings.COVIEW_MODEL_DIR)
+                    _coview_model_mtime = mtime
+                except Exception as e:
+                    logger.error(f"Error loading co-view model: {str(e)}")
+    return _coview_model
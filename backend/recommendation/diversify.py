@@ -0,0 +1,52 @@
+import time
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_rows(matrix):
+    """Scale each row of a matrix to unit length."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+def mmr(query_vector, candidate_vectors, k=10, lambda_=0.7, relevance=None):
+    """Select `k` candidates by maximal marginal relevance.
+
+    Each step picks the candidate maximizing
+    `lambda_ * relevance - (1 - lambda_) * max similarity to the picks so far`.
+    The running maximum is updated with one matrix-vector product per pick, so
+    the cost is O(k * n * d) and a pool of 500 takes a few milliseconds.
+
+    Returns the indices of the selected candidates in selection order.
+    """
+    start = time.perf_counter()
+    candidates = normalize_rows(np.asarray(candidate_vectors, dtype=np.float32))
+    n = len(candidates)
+    k = min(k, n)
+    if k <= 0:
+        return []
+
+    if relevance is None:
+        query = np.asarray(query_vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1)
+        relevance = candidates @ query
+    relevance = np.asarray(relevance, dtype=np.float32)
+
+    selected = []
+    available = np.ones(n, dtype=bool)
+    max_similarity = np.full(n, -np.inf, dtype=np.float32)
+
+    for _ in range(k):
+        redundancy = np.where(np.isneginf(max_similarity), 0, max_similarity)
+        scores = lambda_ * relevance - (1 - lambda_) * redundancy
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+
+        selected.append(best)
+        available[best] = False
+        np.maximum(max_similarity, candidates @ candidates[best], out=max_similarity)
+
+    logger.debug(f"MMR selected {k} of {n} candidates in {(time.perf_counter() - start) * 1000:.2f} ms")
+    return selected
@@ -0,0 +1,144 @@
+import re
+import threading
+from collections import OrderedDict
+import numpy as np
+from django.conf import settings
+from django.core.cache import caches
+import logging
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_query(query):
+    """Normalize a query so trivially different spellings share a cache entry."""
+    return _WHITESPACE_RE.sub(' ', query).strip().lower()
+
+
+class QueryEmbeddingCache:
+    """Bounded LRU cache of query embeddings keyed by model name and normalized query.
+
+    Entries live in an in-process LRU; if a Django cache alias is configured the
+    embeddings are also shared through it so other workers can reuse them.
+    """
+
+    def __init__(self, max_size=10000, backend_alias=None, timeout=None):
+        """Initialize the cache."""
+        self.max_size = max_size
+        self.backend_alias = backend_alias
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.shared_hits = 0
+
+    @property
+    def backend(self):
+        """Return the shared Django cache backend, if one is configured."""
+        if not self.backend_alias:
+            return None
+        return caches[self.backend_alias]
+
+    def make_key(self, model_name, query):
+        """Build the cache key for a query."""
+        return f"query_embedding:{model_name}:{normalize_query(query)}"
+
+    def get(self, model_name, query):
+        """Return the cached embedding for a query, or None on a miss."""
+        key = self.make_key(model_name, query)
+
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return embedding
+
+        if self.backend is not None:
+            try:
+                embedding = self.backend.get(key)
+            except Exception as e:
+                logger.warning(f"Error reading shared embedding cache: {str(e)}")
+                embedding = None
+
+            if embedding is not None:
+                embedding = np.asarray(embedding, dtype=np.float32)
+                self._store_local(key, embedding)
+                with self._lock:
+                    self.hits += 1
+                    self.shared_hits += 1
+                return embedding
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, model_name, query, embedding):
+        """Store the embedding for a query."""
+        key = self.make_key(model_name, query)
+        embedding = np.asarray(embedding, dtype=np.float32)
+        self._store_local(key, embedding)
+
+        if self.backend is not None:
+            try:
+                self.backend.set(key, embedding, timeout=self.timeout)
+            except Exception as e:
+                logger.warning(f"Error writing shared embedding cache: {str(e)}")
+
+    def get_or_compute(self, model_name, query, compute):
+        """Return the cached embedding, computing and storing it on a miss."""
+        embedding = self.get(model_name, query)
+        if embedding is None:
+            embedding = compute(normalize_query(query))
+            self.set(model_name, query, embedding)
+        return embedding
+
+    def _store_local(self, key, embedding):
+        """Insert an entry into the in-process LRU, evicting the oldest if full."""
+        embedding.setflags(write=False)
+        with self._lock:
+            self._entries[key] = embedding
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop all local entries and reset the metrics."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.shared_hits = 0
+
+    def stats(self):
+        """Return hit-rate metrics for the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+_query_embedding_cache = None
+_query_embedding_cache_lock = threading.Lock()
+
+
+def get_query_embedding_cache():
+    """Return the process-wide query embedding cache."""
+    global _query_embedding_cache
+    if _query_embedding_cache is None:
+        with _query_embedding_cache_lock:
+            if _query_embedding_cache is None:
+                _query_embedding_cache = QueryEmbeddingCache(
+                    max_size=settings.QUERY_EMBEDDING_CACHE_SIZE,
+                    backend_alias=settings.QUERY_EMBEDDING_CACHE_BACKEND,
+                    timeout=settings.QUERY_EMBEDDING_CACHE_TIMEOUT,
+                )
+    return _query_embedding_cache
@@ -0,0 +1,40 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from recommendation.coview import CoViewModel
+
+
+class Command(BaseCommand):
+    help = 'Build or incrementally update the item-item co-view model from PaperView sessions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--incremental', action='store_true',
+                            help='Fold in views since the last run instead of rebuilding')
+        parser.add_argument('--output-dir', type=str, default=None,
+                            help='Directory holding the persisted model (defaults to COVIEW_MODEL_DIR)')
+
+    def handle(self, *args, **options):
+        directory = options['output_dir'] or settings.COVIEW_MODEL_DIR
+        start = time.perf_counter()
+
+        model = None
+        if options['incremental']:
+            try:
+                model = CoViewModel.load(directory)
+            except FileNotFoundError:
+                self.stdout.write(self.style.WARNING('No existing co-view model, rebuilding from scratch'))
+
+        if model is None:
+            model = CoViewModel().build()
+        else:
+            model.update()
+
+        model.save(directory)
+        if not model.matrix.nnz:
+            self.stdout.write(self.style.WARNING(
+                'No sessions viewed more than one paper, so co-view blending will have no effect yet'
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f'Co-view model saved to {directory}: {len(model.paper_ids)} papers, '
+            f'{model.matrix.nnz} co-view entries in {time.perf_counter() - start:.1f}s'
+        ))
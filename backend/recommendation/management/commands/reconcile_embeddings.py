@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from recommendation.reconcile import EmbeddingReconciler
+
+
+class Command(BaseCommand):
+    help = 'Report and repair drift between Paper rows, PaperEmbedding rows and the LanceDB vector table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repair', action='store_true',
+                            help='Register stored vectors in PaperEmbedding and drop registrations without a vector')
+        parser.add_argument('--embed-missing', action='store_true',
+                            help='Embed papers that have no vector and add them to LanceDB')
+        parser.add_argument('--delete-orphans', action='store_true',
+                            help='Delete vectors whose paper is missing from the database')
+        parser.add_argument('--model-name', type=str, default='allenai-specter',
+                            help='Embedding model the PaperEmbedding rows are registered under')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of ids written per batch')
+        parser.add_argument('--show', type=int, default=5, help='Number of example ids listed per kind of drift')
+
+    def handle(self, *args, **options):
+        reconciler = EmbeddingReconciler(model_name=options['model_name'], batch_size=options['batch_size'])
+        report = reconciler.run(
+            repair=options['repair'],
+            embed_missing=options['embed_missing'],
+            delete_orphans=options['delete_orphans'],
+        )
+
+        self.stdout.write(
+            f"{report['papers']} papers, {report['vectors']} vectors, {report['registered']} registered embeddings "
+            f"(diffed in {report['seconds']:.2f}s)"
+        )
+        if report['duplicate_vectors']:
+            self.stdout.write(self.style.WARNING(f"{report['duplicate_vectors']} duplicate vector rows"))
+        for kind in ('missing_vectors', 'orphan_vectors', 'unregistered', 'stale_registrations'):
+            ids = report[kind]
+            style = self.style.WARNING if len(ids) else self.style.SUCCESS
+            examples = f": {', '.join(ids[:options['show']])}" if len(ids) and options['show'] else ''
+            self.stdout.write(style(f"{kind.replace('_', ' ')}: {len(ids)}{examples}"))
+
+        for key, label in (('registered_now', 'Registered'), ('unregistered_now', 'Removed stale registrations for'),
+                           ('deleted_vectors', 'Deleted orphan vectors for'), ('embedded', 'Embedded')):
+            if key in report:
+                self.stdout.write(self.style.SUCCESS(f'{label} {report[key]} papers'))
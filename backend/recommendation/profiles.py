@@ -0,0 +1,95 @@
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from core.models import UserPaperInteraction, UserProfileVector
+from .services import RecommendationService
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class UserProfileService:
+    """Service maintaining per-user profile vectors for personalized recommendations.
+
+    A profile is the weighted running mean of the vectors of papers the user
+    interacted with: liked and saved papers pull it towards them, disliked
+    papers push it away. Each interaction updates the stored sum in place, so
+    a personalized feed costs one vector search.
+    """
+
+    def __init__(self, model_name="allenai-specter"):
+        """Initialize the service."""
+        self.model_name = model_name
+        self.recommendation_service = RecommendationService(model_name=model_name)
+        self.weights = settings.INTERACTION_WEIGHTS
+
+    def record_interaction(self, user, paper, interaction_type):
+        """Store an interaction and fold the paper's vector into the user's profile."""
+        interaction = UserPaperInteraction.objects.create(
+            user=user, paper=paper, interaction_type=interaction_type
+        )
+
+        weight = self.weights.get(interaction_type, 0.0)
+        if not weight:
+            return interaction
+
+        vector = self.recommendation_service.get_stored_vectors([paper.id]).get(str(paper.id))
+        if vector is None:
+            logger.warning(f"No stored vector for paper {paper.id}, profile not updated")
+            return interaction
+
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector = vector / norm
+
+        with transaction.atomic():
+            profile, created = (UserProfileVector.objects
+                                .select_for_update()
+                                .get_or_create(user=user, model_name=self.model_name,
+                                               defaults={'vector_sum': np.zeros_like(vector).tobytes()}))
+            vector_sum = np.frombuffer(profile.vector_sum, dtype=np.float32)
+            if vector_sum.shape != vector.shape:
+                logger.warning(f"Resetting profile for user {user.pk}: vector size changed")
+                vector_sum = np.zeros_like(vector)
+                profile.total_weight = 0.0
+                profile.interaction_count = 0
+
+            profile.vector_sum = (vector_sum + weight * vector).astype(np.float32).tobytes()
+            profile.total_weight += abs(weight)
+            profile.interaction_count += 1
+            profile.save()
+
+        return interaction
+
+    def get_profile_vector(self, user):
+        """Return the user's normalized profile vector, or None if there is none yet."""
+        profile = UserProfileVector.objects.filter(user=user, model_name=self.model_name).first()
+        if profile is None or not profile.total_weight:
+            return None
+
+        vector = np.frombuffer(profile.vector_sum, dtype=np.float32) / profile.total_weight
+        norm = np.linalg.norm(vector)
+        if not norm:
+            return None
+        return vector / norm
+
+    def recommend(self, user, top_k=10, exclude_limit=500):
+        """Recommend papers for a user with a single vector search."""
+        try:
+            vector = self.get_profile_vector(user)
+            if vector is None:
+                return []
+
+            # Push the exclusion of papers the user already interacted with into the query
+            seen_ids = list(dict.fromkeys(UserPaperInteraction.objects
+                                          .filter(user=user)
+                                          .order_by('-timestamp')
+                                          .values_list('paper_id', flat=True)[:exclude_limit]))
+            results = self.recommendation_service.search_embeddings(
+                [vector], top_k=top_k, filters={'exclude_ids': seen_ids}
+            )[0]
+            return self.recommendation_service.get_papers_in_order(results['id'].tolist())
+
+        except Exception as e:
+            logger.error(f"Error getting personalized recommendations: {str(e)}")
+            return []
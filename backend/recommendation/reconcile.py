@@ -0,0 +1,194 @@
+import time
+import numpy as np
+import pandas as pd
+from core.models import Paper, PaperEmbedding
+from utils.lancedb_utils import VECTOR_COLUMN, LanceDBClient, quote_ids
+from .services import RecommendationService
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def sorted_ids(ids):
+    """Return the distinct ids as a sorted NumPy string array."""
+    # Python's sort beats np.unique on unicode arrays by a wide margin
+    return np.asarray(sorted(set(ids)), dtype=str)
+
+
+def contains(sorted_array, ids):
+    """Return a mask of which `ids` are present in `sorted_array`, by binary search."""
+    if not len(sorted_array):
+        return np.zeros(len(ids), dtype=bool)
+    positions = np.minimum(np.searchsorted(sorted_array, ids), len(sorted_array) - 1)
+    return sorted_array[positions] == ids
+
+
+def difference(a, b):
+    """Return the ids of sorted array `a` missing from sorted array `b`."""
+    return a[~contains(b, a)]
+
+
+class EmbeddingReconciler:
+    """Detects and repairs drift between Paper rows, PaperEmbedding rows and LanceDB vectors.
+
+    Each id set is loaded with one column scan (LanceDB) or one streamed
+    `values_list` query (Django), turned into a sorted NumPy array, and
+    compared by binary search against the other sorted arrays, so millions
+    of ids are reconciled in seconds without per-row queries.
+    """
+
+    def __init__(self, model_name="allenai-specter", table_name="research_papers", batch_size=1000):
+        """Initialize the reconciler."""
+        self.model_name = model_name
+        self.table_name = table_name
+        self.batch_size = batch_size
+        self.lance = LanceDBClient()
+
+    @property
+    def table(self):
+        """The shared LanceDB table handle."""
+        return self.lance.open_table(self.table_name)
+
+    def vector_dimensions(self):
+        """Return the length of the table's vectors."""
+        return self.table.schema.field(VECTOR_COLUMN).type.list_size
+
+    def lance_ids(self):
+        """Return (sorted distinct ids, number of duplicate rows) of the LanceDB table."""
+        column = self.table.to_lance().to_table(columns=["id"]).column("id")
+        ids = column.to_numpy(zero_copy_only=False)
+        unique = sorted_ids(ids)
+        return unique, len(ids) - len(unique)
+
+    def paper_ids(self):
+        """Return the sorted ids of every Paper row."""
+        return sorted_ids(list(Paper.objects.values_list('id', flat=True).iterator(chunk_size=10000)))
+
+    def registered_ids(self):
+        """Return the sorted ids of papers with a PaperEmbedding row for the model."""
+        return sorted_ids(list(PaperEmbedding.objects
+                               .filter(model_name=self.model_name)
+                               .values_list('paper_id', flat=True)
+                               .iterator(chunk_size=10000)))
+
+    def diff(self):
+        """Compare the three id sets and return the drift, as sorted id arrays and counts."""
+        start = time.perf_counter()
+        papers = self.paper_ids()
+        vectors, duplicates = self.lance_ids()
+        registered = self.registered_ids()
+
+        with_vectors = papers[contains(vectors, papers)]
+        report = {
+            'papers': len(papers),
+            'vectors': len(vectors),
+            'registered': len(registered),
+            'duplicate_vectors': duplicates,
+            # Papers search can never return
+            'missing_vectors': difference(papers, vectors),
+            # Vectors search returns but then silently drops
+            'orphan_vectors': difference(vectors, papers),
+            # Papers with a vector that PaperEmbedding does not know about
+            'unregistered': difference(with_vectors, registered),
+            # PaperEmbedding rows whose vector does not exist
+            'stale_registrations': difference(registered, vectors),
+        }
+        report['seconds'] = time.perf_counter() - start
+        return report
+
+    def register(self, paper_ids, dimensions=None):
+        """Create PaperEmbedding rows for papers whose vectors are stored under their own id."""
+        dimensions = dimensions or self.vector_dimensions()
+        PaperEmbedding.objects.bulk_create(
+            [PaperEmbedding(paper_id=pid, model_name=self.model_name, vector_id=pid, dimensions=dimensions)
+             for pid in paper_ids],
+            batch_size=self.batch_size,
+            ignore_conflicts=True,
+        )
+        return len(paper_ids)
+
+    def unregister(self, paper_ids):
+        """Delete the PaperEmbedding rows of papers without a stored vector."""
+        deleted = 0
+        for start in range(0, len(paper_ids), self.batch_size):
+            batch = list(paper_ids[start:start + self.batch_size])
+            count, _ = PaperEmbedding.objects.filter(model_name=self.model_name, paper_id__in=batch).delete()
+            deleted += count
+        return deleted
+
+    def delete_orphans(self, ids):
+        """Delete vectors whose paper is missing from the database."""
+        table = self.table
+        for start in range(0, len(ids), self.batch_size):
+            table.delete(f"id IN ({quote_ids(ids[start:start + self.batch_size])})")
+        if len(ids):
+            self.lance.table_changed(self.table_name)
+        return len(ids)
+
+    def embed_missing(self, paper_ids):
+        """Embed papers without a stored vector, add them to LanceDB and register them.
+
+        The embedded text is built by the data pipeline's TextProcessor, so
+        the new vectors match the cleaned `enhanced_text` every other row was
+        embedded from. Requires the data pipeline package (and nltk) to be
+        installed.
+        """
+        try:
+            from preprocessing.text_processor import TextProcessor
+        except ImportError as e:
+            raise ImportError("Embedding missing papers needs the data pipeline package: "
+                              "pip install -e data_pipeline") from e
+
+        text_processor = TextProcessor()
+        service = RecommendationService(model_name=self.model_name)
+        embedded = 0
+        for start in range(0, len(paper_ids), self.batch_size):
+            papers = list(Paper.objects.in_bulk(list(paper_ids[start:start + self.batch_size])).values())
+            if not papers:
+                continue
+
+            # Raw fields as the pipeline reads them from the arXiv data
+            records = [
+                {
+                    "id": str(paper.id),
+                    "title": paper.title,
+                    "authors": ",".join(paper.authors or []),
+                    "abstract": paper.abstract,
+                    "categories": paper.categories,
+                    "comments": paper.comments or "",
+                    "update_date": str(paper.update_date),
+                }
+                for paper in papers
+            ]
+            texts = text_processor.process_dataframe(pd.DataFrame(records))['enhanced_text'].tolist()
+            embeddings = service.encode_texts(texts)
+            rows = [
+                {
+                    **record,
+                    "enhanced_text": text,
+                    VECTOR_COLUMN: embedding.astype(np.float32).tolist(),
+                }
+                for record, text, embedding in zip(records, texts, embeddings)
+            ]
+            self.lance.create_table(self.table_name, rows, mode="append")
+            self.register([row["id"] for row in rows], dimensions=embeddings.shape[1])
+            embedded += len(rows)
+            logger.info(f"Embedded {embedded}/{len(paper_ids)} missing papers")
+        return embedded
+
+    def run(self, repair=False, embed_missing=False, delete_orphans=False):
+        """Diff the id sets and apply the requested repairs.
+
+        `repair` fixes the PaperEmbedding registry, `embed_missing` adds
+        vectors for papers without one and `delete_orphans` removes vectors
+        whose paper is gone. Returns the diff report plus repair counts.
+        """
+        report = self.diff()
+        if repair:
+            report['registered_now'] = self.register(report['unregistered'])
+            report['unregistered_now'] = self.unregister(report['stale_registrations'])
+        if delete_orphans:
+            report['deleted_vectors'] = self.delete_orphans(report['orphan_vectors'])
+        if embed_missing:
+            report['embedded'] = self.embed_missing(report['missing_vectors'])
+        return report
@@ -0,0 +1,143 @@
+import hashlib
+import json
+import threading
+import time
+from django.conf import settings
+from django.core.cache import caches
+from utils.lancedb_utils import LanceDBClient, add_table_change_listener
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ResultCache:
+    """Response-level cache for search results and recommendation lists.
+
+    Keys include the model name and the LanceDB table version, so a rebuilt
+    table never serves results computed against the previous one. Explicit
+    invalidation bumps a generation counter shared through the cache backend;
+    it runs whenever this process rewrites the table through LanceDBClient,
+    since a dropped and recreated table starts again at version 1.
+    """
+
+    GENERATION_KEY = "result_cache:generation"
+
+    def __init__(self, backend_alias="default", timeout=300, table_name="research_papers",
+                 version_check_interval=30):
+        """Initialize the cache."""
+        self.backend_alias = backend_alias
+        self.timeout = timeout
+        self.table_name = table_name
+        self.version_check_interval = version_check_interval
+        self._lock = threading.Lock()
+        self._table_version = None
+        self._version_checked_at = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def backend(self):
+        """Return the Django cache backend holding the results."""
+        return caches[self.backend_alias]
+
+    def table_version(self):
+        """Return the LanceDB table version, re-reading it at most every few seconds."""
+        now = time.monotonic()
+        with self._lock:
+            if self._version_checked_at and now - self._version_checked_at < self.version_check_interval:
+                return self._table_version
+
+        try:
+            table = LanceDBClient().open_table(self.table_name)
+            version = getattr(table, "version", None)
+        except Exception as e:
+            logger.warning(f"Error reading version of table {self.table_name}: {str(e)}")
+            version = None
+
+        with self._lock:
+            self._table_version = version
+            self._version_checked_at = now
+        return version
+
+    def generation(self):
+        """Return the current invalidation generation."""
+        return self.backend.get_or_set(self.GENERATION_KEY, 0, timeout=None)
+
+    def make_key(self, endpoint, model_name, **params):
+        """Build the cache key for an endpoint call."""
+        payload = json.dumps(params, sort_keys=True, default=str)
+        digest = hashlib.sha1(payload.encode("utf-8")).hexdigest()
+        return (f"result_cache:{self.generation()}:{self.table_name}:{self.table_version()}:"
+                f"{model_name}:{endpoint}:{digest}")
+
+    def get(self, endpoint, model_name, **params):
+        """Return the cached result for an endpoint call, or None on a miss."""
+        try:
+            data = self.backend.get(self.make_key(endpoint, model_name, **params))
+        except Exception as e:
+            logger.warning(f"Error reading result cache: {str(e)}")
+            data = None
+
+        with self._lock:
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return data
+
+    def set(self, endpoint, model_name, data, **params):
+        """Store the result of an endpoint call."""
+        try:
+            self.backend.set(self.make_key(endpoint, model_name, **params), data, timeout=self.timeout)
+        except Exception as e:
+            logger.warning(f"Error writing result cache: {str(e)}")
+
+    def invalidate(self):
+        """Invalidate every cached result, e.g. after the table has been rebuilt."""
+        try:
+            self.backend.add(self.GENERATION_KEY, 0, timeout=None)
+            self.backend.incr(self.GENERATION_KEY)
+        except Exception as e:
+            logger.warning(f"Error invalidating result cache: {str(e)}")
+
+        with self._lock:
+            self._version_checked_at = 0.0
+
+    def stats(self):
+        """Return hit-rate metrics for the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "table_version": self._table_version,
+            }
+
+
+_result_cache = None
+_result_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    """Return the process-wide result cache."""
+    global _result_cache
+    if _result_cache is None:
+        with _result_cache_lock:
+            if _result_cache is None:
+                _result_cache = ResultCache(
+                    backend_alias=settings.RESULT_CACHE_BACKEND,
+                    timeout=settings.RESULT_CACHE_TIMEOUT,
+                    version_check_interval=settings.RESULT_CACHE_VERSION_CHECK_INTERVAL,
+                )
+    return _result_cache
+
+
+def invalidate_on_table_change(table_name):
+    """Invalidate the result cache when its table is rewritten."""
+    cache = get_result_cache()
+    if table_name == cache.table_name:
+        cache.invalidate()
+
+
+add_table_change_listener(invalidate_on_table_change)
@@ -1,37 +1,161 @@
 import os
+import threading
 import numpy as np
-import lancedb
+from django.utils import timezone
 from sentence_transformers import SentenceTransformer
-from django.conf import settings
 from core.models import Paper, Recommendation
+from utils.lancedb_utils import VECTOR_COLUMN, LanceDBClient, fetch_vectors
+from .diversify import mmr
+from .embedding_cache import get_query_embedding_cache, normalize_query
 import logging
 
 logger = logging.getLogger(__name__)
 
+_embedding_models = {}
+_embedding_models_lock = threading.Lock()
+
+
+def get_embedding_model(model_name):
+    """Load a sentence transformer once per process and reuse it."""
+    model = _embedding_models.get(model_name)
+    if model is None:
+        with _embedding_models_lock:
+            model = _embedding_models.get(model_name)
+            if model is None:
+                logger.info(f"Loading embedding model {model_name}")
+                model = SentenceTransformer(model_name)
+                _embedding_models[model_name] = model
+    return model
+
 class RecommendationService:
     """Service for generating paper recommendations."""
     
     def __init__(self, model_name="allenai-specter"):
         """Initialize with the specified model."""
         self.model_name = model_name
-        self.embedding_model = SentenceTransformer(model_name)
+        self.query_cache = get_query_embedding_cache()
         
-        # Connect to LanceDB
-        self.db = lancedb.connect(settings.LANCEDB_PATH)
+        # Shared, cached LanceDB table handle
+        self.lance = LanceDBClient()
         self.table_name = "research_papers"
         
         # Check if table exists
-        if self.table_name not in self.db.table_names():
+        if not self.lance.table_exists(self.table_name):
             logger.error(f"Table {self.table_name} does not exist in LanceDB")
-        else:
-            self.table = self.db.open_table(self.table_name)
+    
+    @property
+    def table(self):
+        """The LanceDB table handle, reopened by the client once the table has a new version."""
+        return self.lance.open_table(self.table_name)
+    
+    @property
+    def embedding_model(self):
+        """The sentence transformer, loaded on first use."""
+        return get_embedding_model(self.model_name)
     
     def generate_embedding(self, text):
         """Generate embedding for a given text."""
         return self.embedding_model.encode(text)
     
-    def get_similar_papers(self, paper_id, top_k=10):
-        """Get similar papers for a given paper ID."""
+    def embed_query(self, query):
+        """Get the embedding for a search query, reusing cached embeddings."""
+        return self.query_cache.get_or_compute(self.model_name, query, self.generate_embedding)
+    
+    def encode_texts(self, texts):
+        """Generate embeddings for several texts in a single batch."""
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.asarray(self.embedding_model.encode(list(texts), show_progress_bar=False))
+    
+    def embed_queries(self, queries):
+        """Get embeddings for several search queries, encoding only the cache misses in one batch."""
+        embeddings = [self.query_cache.get(self.model_name, query) for query in queries]
+        
+        misses = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if misses:
+            encoded = self.encode_texts([normalize_query(queries[i]) for i in misses])
+            for i, embedding in zip(misses, encoded):
+                self.query_cache.set(self.model_name, queries[i], embedding)
+                embeddings[i] = embedding
+        
+        return embeddings
+    
+    def search_embeddings(self, embeddings, top_k=10, filters=None):
+        """Search LanceDB for several embeddings in one batched call and return a results DataFrame for each."""
+        results = self.lance.search_many(self.table_name, embeddings, k=top_k, filters=filters)
+        return [result.to_pandas() for result in results]
+    
+    def diversify_results(self, query_vector, results, top_k=10, mmr_lambda=0.7):
+        """Pick a diverse top-k from an over-fetched results DataFrame with MMR."""
+        if results.empty:
+            return results
+        
+        vectors = np.stack(results[VECTOR_COLUMN].to_numpy())
+        relevance = 1 - results['_distance'].to_numpy(dtype=np.float32)
+        selected = mmr(query_vector, vectors, k=top_k, lambda_=mmr_lambda, relevance=relevance)
+        return results.iloc[selected]
+    
+    def get_stored_vectors(self, paper_ids):
+        """Fetch the stored LanceDB vectors for papers, keyed by paper id."""
+        return fetch_vectors(self.table, paper_ids)
+    
+    def get_papers_in_order(self, paper_ids):
+        """Fetch papers with one query, preserving the order of the given ids."""
+        papers = Paper.objects.filter(id__in=paper_ids)
+        papers_dict = {str(paper.id): paper for paper in papers}
+        
+        missing = [pid for pid in paper_ids if pid not in papers_dict]
+        if missing:
+            logger.warning(f"{len(missing)} papers returned by LanceDB are missing from the database")
+        
+        return [papers_dict[pid] for pid in paper_ids if pid in papers_dict]
+    
+    def store_recommendations(self, paper, rows, save=True):
+        """Create or update Recommendation rows for a paper from (paper id, distance) pairs.
+        
+        With `save=False` the rows are built but not written, for result
+        lists that must not replace the stored plain top-k.
+        """
+        # Filter out the query paper itself
+        rows = [(str(pid), distance) for pid, distance in rows if str(pid) != str(paper.id)]
+        recommended_papers = {str(p.id): p for p in Paper.objects.filter(id__in=[pid for pid, _ in rows])}
+        
+        recommendations = []
+        for pid, distance in rows:
+            recommended_paper = recommended_papers.get(pid)
+            if recommended_paper is None:
+                logger.warning(f"Paper {pid} not found in database")
+                continue
+            
+            if not save:
+                recommendations.append(Recommendation(
+                    source_paper=paper,
+                    recommended_paper=recommended_paper,
+                    model_name=self.model_name,
+                    similarity_score=1 - distance,
+                    recommendation_date=timezone.now(),
+                ))
+                continue
+            
+            # Create or update recommendation
+            recommendation, created = Recommendation.objects.update_or_create(
+                source_paper=paper,
+                recommended_paper=recommended_paper,
+                model_name=self.model_name,
+                defaults={'similarity_score': 1 - distance}
+            )
+            
+            recommendations.append(recommendation)
+        
+        return recommendations
+    
+    def get_similar_papers(self, paper_id, top_k=10, mmr_lambda=None, pool_size=100):
+        """Get similar papers for a given paper ID.
+        
+        If `mmr_lambda` is given, `pool_size` candidates are fetched and
+        diversified with maximal marginal relevance. Diversified lists are
+        returned unsaved, so the stored recommendations stay the plain top-k.
+        """
         try:
             # Get the paper
             paper = Paper.objects.get(id=paper_id)
@@ -40,30 +164,15 @@ class RecommendationService:
             embedding = self.generate_embedding(paper.abstract)
             
             # Search for similar papers in LanceDB
-            results = self.table.search(embedding).metric("cosine").limit(top_k + 1).to_pandas()
+            limit = max(pool_size, top_k) + 1 if mmr_lambda is not None else top_k + 1
+            results = self.search_embeddings([embedding], top_k=limit)[0]
+            if mmr_lambda is not None:
+                results = results[results['id'] != str(paper.id)]
+                results = self.diversify_results(embedding, results, top_k=top_k, mmr_lambda=mmr_lambda)
             
-            # Filter out the query paper itself
-            results = results[results['id'] != paper_id]
-            
-            # Create recommendations in the database
-            recommendations = []
-            for _, row in results.iterrows():
-                try:
-                    recommended_paper = Paper.objects.get(id=row['id'])
-                    
-                    # Create or update recommendation
-                    recommendation, created = Recommendation.objects.update_or_create(
-                        source_paper=paper,
-                        recommended_paper=recommended_paper,
-                        model_name=self.model_name,
-                        defaults={'similarity_score': 1 - row['_distance']}
-                    )
-                    
-                    recommendations.append(recommendation)
-                except Paper.DoesNotExist:
-                    logger.warning(f"Paper {row['id']} not found in database")
-            
-            return recommendations
+            # Create recommendations in the database (plain top-k only)
+            return self.store_recommendations(paper, zip(results['id'], results['_distance']),
+                                              save=mmr_lambda is None)
         
         except Paper.DoesNotExist:
             logger.error(f"Paper {paper_id} not found")
@@ -73,26 +182,114 @@ class RecommendationService:
             logger.error(f"Error getting similar papers: {str(e)}")
             return []
     
-    def search_papers(self, query, top_k=10):
-        """Search for papers based on a query string."""
+    def blend_with_coview(self, paper, recommendations, coview_model, alpha=0.3, top_k=10):
+        """Rerank recommendations by blending vector similarity with co-view scores.
+        
+        Papers often co-viewed with `paper` join the candidates even if the
+        vector search did not return them; their similarity comes from the
+        stored vectors. Returns (recommendation, co-view score, blended score)
+        tuples, best first. Recommendations for co-view-only candidates are
+        not saved.
+        """
+        candidates = {str(r.recommended_paper_id): r for r in recommendations}
+        related = dict(coview_model.top_related(paper.id, k=top_k))
+        
+        extra_ids = [pid for pid in related if pid not in candidates and pid != str(paper.id)]
+        if extra_ids:
+            vectors = self.get_stored_vectors([paper.id, *extra_ids])
+            source = vectors.get(str(paper.id))
+            extra_papers = Paper.objects.in_bulk(extra_ids)
+            for pid in extra_ids:
+                if source is None or pid not in vectors or pid not in extra_papers:
+                    continue
+                similarity = float(np.dot(source, vectors[pid]) /
+                                   ((np.linalg.norm(source) * np.linalg.norm(vectors[pid])) or 1))
+                candidates[pid] = Recommendation(
+                    source_paper=paper,
+                    recommended_paper=extra_papers[pid],
+                    similarity_score=similarity,
+                    model_name=self.model_name,
+                )
+        
+        coview_scores = coview_model.scores(paper.id, candidate_ids=list(candidates))
+        blended = [
+            (r, coview_scores[pid], (1 - alpha) * r.similarity_score + alpha * coview_scores[pid])
+            for pid, r in candidates.items()
+        ]
+        blended.sort(key=lambda item: item[2], reverse=True)
+        return blended[:top_k]
+    
+    def get_similar_papers_batch(self, papers, top_k=10):
+        """Compute and store recommendations for several papers with one encode and one batched search."""
+        papers = list(papers)
+        if not papers:
+            return {}
+        
+        try:
+            embeddings = self.encode_texts([paper.abstract for paper in papers])
+            frames = self.search_embeddings(embeddings, top_k=top_k + 1)
+        except Exception as e:
+            logger.error(f"Error getting similar papers: {str(e)}")
+            return {}
+        
+        # Resolve every recommended paper with a single query
+        rows_by_paper = {}
+        for paper, frame in zip(papers, frames):
+            rows = [(str(pid), float(distance)) for pid, distance in zip(frame['id'], frame['_distance'])
+                    if str(pid) != str(paper.id)]
+            rows_by_paper[str(paper.id)] = rows[:top_k]
+        recommended_ids = {pid for rows in rows_by_paper.values() for pid, _ in rows}
+        existing_ids = set(Paper.objects.filter(id__in=recommended_ids).values_list('id', flat=True))
+        
+        new_recommendations = [
+            Recommendation(
+                source_paper_id=source_id,
+                recommended_paper_id=pid,
+                model_name=self.model_name,
+                similarity_score=1 - distance,
+            )
+            for source_id, rows in rows_by_paper.items()
+            for pid, distance in rows
+            if pid in existing_ids
+        ]
+        Recommendation.objects.bulk_create(
+            new_recommendations,
+            update_conflicts=True,
+            unique_fields=['source_paper', 'recommended_paper', 'model_name'],
+            update_fields=['similarity_score'],
+        )
+        
+        # Re-read so the returned rows carry their stored primary keys
+        recommendations = {source_id: [] for source_id in rows_by_paper}
+        stored = (Recommendation.objects
+                  .filter(source_paper_id__in=list(rows_by_paper), model_name=self.model_name)
+                  .select_related('recommended_paper')
+                  .order_by('-similarity_score'))
+        for recommendation in stored:
+            recommendations[str(recommendation.source_paper_id)].append(recommendation)
+        
+        return recommendations
+    
+    def search_papers(self, query, top_k=10, filters=None, mmr_lambda=None, pool_size=100):
+        """Search for papers based on a query string.
+        
+        If `mmr_lambda` is given, `pool_size` candidates are fetched and
+        diversified with maximal marginal relevance.
+        """
         try:
-            # Generate embedding for the query
-            embedding = self.generate_embedding(query)
+            # Get the (possibly cached) embedding for the query
+            embedding = self.embed_query(query)
             
             # Search for similar papers in LanceDB
-            results = self.table.search(embedding).metric("cosine").limit(top_k).to_pandas()
-            
-            # Get paper objects
-            paper_ids = results['id'].tolist()
-            papers = list(Paper.objects.filter(id__in=paper_ids))
+            if mmr_lambda is None:
+                results = self.search_embeddings([embedding], top_k=top_k, filters=filters)[0]
+            else:
+                results = self.search_embeddings([embedding], top_k=max(pool_size, top_k), filters=filters)[0]
+                results = self.diversify_results(embedding, results, top_k=top_k, mmr_lambda=mmr_lambda)
             
-            # Sort papers by similarity score
-            papers_dict = {str(paper.id): paper for paper in papers}
-            sorted_papers = [papers_dict[pid] if pid in papers_dict else None for pid in paper_ids]
-            sorted_papers = [p for p in sorted_papers if p is not None]
-            
-            return sorted_papers
+            # Get paper objects sorted by similarity score
+            return self.get_papers_in_order(results['id'].tolist())
         
         except Exception as e:
             logger.error(f"Error searching papers: {str(e)}")
-            return []
\ No newline at end of file
+            return []
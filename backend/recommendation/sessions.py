@@ -0,0 +1,84 @@
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from core.analytics import get_analytics_writer
+from core.models import PaperView
+from .services import RecommendationService
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SessionRecommendationService:
+    """Service for "continue exploring" recommendations from a session's view history.
+
+    The last N viewed papers are combined into a centroid of their stored
+    vectors, with more recent views weighted higher. The centroid is cached
+    per session until the session views something new.
+    """
+
+    def __init__(self, model_name="allenai-specter", history_size=None, decay=None):
+        """Initialize the service."""
+        self.model_name = model_name
+        self.history_size = history_size or settings.SESSION_HISTORY_SIZE
+        self.decay = decay or settings.SESSION_HISTORY_DECAY
+        self.recommendation_service = RecommendationService(model_name=model_name)
+
+    def get_recent_paper_ids(self, session_id):
+        """Return the session's most recently viewed paper ids, newest first and deduplicated."""
+        # Views still waiting in the write-behind buffer are the newest ones
+        pending = [view.paper_id for view in reversed(get_analytics_writer().pending(PaperView))
+                   if view.session_id == session_id]
+        stored = (PaperView.objects
+                  .filter(session_id=session_id)
+                  .order_by('-timestamp')
+                  .values_list('paper_id', flat=True)[:self.history_size * 2])
+
+        return list(dict.fromkeys([*pending, *stored]))[:self.history_size]
+
+    def get_session_vector(self, session_id, paper_ids):
+        """Return the decayed centroid of the session's viewed papers, using the cache when valid."""
+        cache_key = f"session_centroid:{self.model_name}:{session_id}"
+        cached = cache.get(cache_key)
+        if cached is not None and cached['paper_ids'] == paper_ids:
+            return np.frombuffer(cached['vector'], dtype=np.float32)
+
+        vectors = self.recommendation_service.get_stored_vectors(paper_ids)
+        rows = [(i, vectors[pid]) for i, pid in enumerate(paper_ids) if pid in vectors]
+        if not rows:
+            return None
+
+        weights = self.decay ** np.array([i for i, _ in rows], dtype=np.float32)
+        matrix = np.stack([vector for _, vector in rows])
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = matrix / np.where(norms == 0, 1, norms)
+
+        centroid = (weights[:, None] * matrix).sum(axis=0) / weights.sum()
+        norm = np.linalg.norm(centroid)
+        if not norm:
+            return None
+        centroid = (centroid / norm).astype(np.float32)
+
+        cache.set(cache_key, {'paper_ids': paper_ids, 'vector': centroid.tobytes()},
+                  timeout=settings.SESSION_CENTROID_CACHE_TIMEOUT)
+        return centroid
+
+    def recommend(self, session_id, top_k=10):
+        """Recommend unseen papers for a session with one vector search."""
+        try:
+            paper_ids = self.get_recent_paper_ids(session_id)
+            if not paper_ids:
+                return []
+
+            vector = self.get_session_vector(session_id, paper_ids)
+            if vector is None:
+                return []
+
+            results = self.recommendation_service.search_embeddings(
+                [vector], top_k=top_k, filters={'exclude_ids': paper_ids}
+            )[0]
+            return self.recommendation_service.get_papers_in_order(results['id'].tolist())
+
+        except Exception as e:
+            logger.error(f"Error getting session recommendations: {str(e)}")
+            return []
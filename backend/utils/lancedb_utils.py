@@ -1,4 +1,7 @@
 # backend/utils/lancedb_utils.py
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import lancedb
 import pandas as pd
 import numpy as np
@@ -8,12 +11,91 @@ from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
+# Column holding the paper embeddings in the research_papers table
+VECTOR_COLUMN = "embedding"
+
+# Callbacks run with the table name whenever a table is rewritten through LanceDBClient
+_table_change_listeners = []
+
+def add_table_change_listener(callback):
+    """Register a callback to run with the table name after a table is rewritten."""
+    if callback not in _table_change_listeners:
+        _table_change_listeners.append(callback)
+
+def quote_ids(ids):
+    """Format ids as a SQL list literal for LanceDB filters."""
+    return ", ".join("'" + str(i).replace("'", "''") + "'" for i in ids)
+
+def build_where_clause(filters):
+    """Translate search filters into a LanceDB where clause."""
+    if not filters:
+        return None
+    
+    clauses = []
+    category = filters.get('category')
+    if category:
+        category = category.replace("'", "''")
+        # Match whole space-separated categories, so 'cs' does not match every 'cs.*' paper
+        clauses.append(f"(' ' || categories || ' ') LIKE '% {category} %'")
+    
+    exclude_ids = filters.get('exclude_ids')
+    if exclude_ids:
+        clauses.append(f"id NOT IN ({quote_ids(exclude_ids)})")
+    
+    return " AND ".join(clauses) or None
+
+def fetch_vectors(table, ids, vector_column=VECTOR_COLUMN):
+    """Fetch the stored vectors for the given ids with a single filtered scan.
+    
+    Returns a dict mapping id to a float32 vector; ids missing from the table are skipped.
+    """
+    ids = [str(i) for i in ids]
+    if not ids:
+        return {}
+    
+    arrow_table = table.to_lance().to_table(
+        columns=["id", vector_column],
+        filter=f"id IN ({quote_ids(ids)})"
+    )
+    if arrow_table.num_rows == 0:
+        return {}
+    
+    found_ids = arrow_table.column("id").to_pylist()
+    vectors = (arrow_table.column(vector_column).combine_chunks().flatten()
+               .to_numpy(zero_copy_only=False).astype(np.float32)
+               .reshape(len(found_ids), -1))
+    return dict(zip(found_ids, vectors))
+
+_search_executor = None
+_search_executor_lock = threading.Lock()
+
+def get_search_executor():
+    """Return the process-wide thread pool that runs vector searches concurrently."""
+    global _search_executor
+    if _search_executor is None:
+        with _search_executor_lock:
+            if _search_executor is None:
+                _search_executor = ThreadPoolExecutor(max_workers=settings.LANCEDB_SEARCH_THREADS,
+                                                      thread_name_prefix="lancedb-search")
+    return _search_executor
+
 class LanceDBClient:
-    """Utility class for LanceDB operations."""
+    """Utility class for LanceDB operations.
     
-    def __init__(self, db_uri=None):
+    Opened table handles are cached per process and shared by every client.
+    A handle is re-checked at most every LANCEDB_TABLE_REFRESH_INTERVAL
+    seconds and only replaced when the table has moved to a new version, so
+    readers keep the dataset metadata and index caches of a warm handle.
+    """
+    
+    _tables = {}
+    _tables_lock = threading.Lock()
+    
+    def __init__(self, db_uri=None, refresh_interval=None):
         """Initialize LanceDB connection."""
         self.db_uri = db_uri or settings.LANCEDB_PATH
+        self.refresh_interval = (settings.LANCEDB_TABLE_REFRESH_INTERVAL
+                                 if refresh_interval is None else refresh_interval)
         self.db = None
         
         # Create directory if it doesn't exist
@@ -29,6 +111,52 @@ class LanceDBClient:
             logger.error(f"Error connecting to LanceDB: {str(e)}")
             raise
     
+    def table_exists(self, table_name):
+        """Return whether a table exists, without listing the database when its handle is cached."""
+        if (self.db_uri, table_name) in self._tables:
+            return True
+        if not self.db:
+            self.connect()
+        return table_name in self.db.table_names()
+    
+    def open_table(self, table_name):
+        """Return the cached handle for a table, reopening it once the table has a new version."""
+        key = (self.db_uri, table_name)
+        entry = self._tables.get(key)
+        if entry is not None and time.monotonic() - entry[1] < self.refresh_interval:
+            return entry[0]
+        
+        with self._tables_lock:
+            entry = self._tables.get(key)
+            now = time.monotonic()
+            if entry is not None and now - entry[1] < self.refresh_interval:
+                return entry[0]
+            
+            if not self.db:
+                self.connect()
+            latest = self.db.open_table(table_name)
+            if entry is not None and getattr(entry[0], "version", None) == getattr(latest, "version", None):
+                table = entry[0]
+            else:
+                table = latest
+                logger.info(f"Opened table {table_name} at version {getattr(latest, 'version', None)}")
+            self._tables[key] = (table, now)
+            return table
+    
+    def invalidate_table(self, table_name):
+        """Drop the cached handle for a table so the next access reopens it."""
+        with self._tables_lock:
+            self._tables.pop((self.db_uri, table_name), None)
+    
+    def table_changed(self, table_name):
+        """Drop the cached handle of a rewritten table and notify the change listeners."""
+        self.invalidate_table(table_name)
+        for callback in list(_table_change_listeners):
+            try:
+                callback(table_name)
+            except Exception as e:
+                logger.warning(f"Error notifying change of table {table_name}: {str(e)}")
+    
     def create_table(self, table_name, data, schema=None, mode="create"):
         """Create a table with the given data."""
         if not self.db:
@@ -49,6 +177,9 @@ class LanceDBClient:
                 logger.info(f"Creating new table {table_name}.")
                 table = self.db.create_table(table_name, data=data, schema=schema)
             
+            # Cached handles and responses were built against the old table contents
+            self.table_changed(table_name)
+            
             return table
         
         except Exception as e:
@@ -57,29 +188,52 @@ class LanceDBClient:
     
     def search_similar(self, table_name, query_vector, k=10, metric="cosine"):
         """Search for similar vectors in a table."""
-        if not self.db:
-            self.connect()
-        
         try:
-            table = self.db.open_table(table_name)
+            table = self.open_table(table_name)
             results = table.search(query_vector).limit(k).metric(metric).to_pandas()
             return results
         except Exception as e:
             logger.error(f"Error searching table {table_name}: {str(e)}")
             raise
     
+    def search_many(self, table_name, query_vectors, k=10, filters=None, metric="cosine", columns=None):
+        """Search for the nearest rows of several query vectors in one call.
+        
+        `filters` is a filters dict (see build_where_clause) or a where
+        clause, applied before the vector search. The queries share one
+        table handle and run concurrently on the search thread pool. Returns
+        one Arrow table per query vector, in order.
+        """
+        where = filters if isinstance(filters, str) else build_where_clause(filters)
+        
+        try:
+            table = self.open_table(table_name)
+            
+            def search(vector):
+                query = table.search(vector).metric(metric)
+                if where:
+                    query = query.where(where, prefilter=True)
+                if columns:
+                    query = query.select(columns)
+                return query.limit(k).to_arrow()
+            
+            if len(query_vectors) <= 1:
+                return [search(vector) for vector in query_vectors]
+            return list(get_search_executor().map(search, query_vectors))
+        except Exception as e:
+            logger.error(f"Error searching table {table_name}: {str(e)}")
+            raise
+    
     def get_table_info(self, table_name):
         """Get information about a table."""
-        if not self.db:
-            self.connect()
-        
         try:
-            table = self.db.open_table(table_name)
+            table = self.open_table(table_name)
             return {
                 "name": table_name,
                 "num_rows": len(table),
+                "version": getattr(table, "version", None),
                 "schema": table.schema
             }
         except Exception as e:
             logger.error(f"Error getting info for table {table_name}: {str(e)}")
-            raise
\ No newline at end of file
+            raise
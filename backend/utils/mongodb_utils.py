@@ -1,24 +1,60 @@
 # backend/utils/mongodb_utils.py
+import threading
 import pymongo
+from pymongo.errors import BulkWriteError
 import logging
 from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_mongo_client(uri=None):
+    """Return the process-wide MongoClient for a URI.
+
+    MongoClient is thread-safe and keeps its own connection pool, so one
+    instance per URI is shared by every MongoDBClient in the process.
+    """
+    uri = uri or settings.MONGODB_URI
+    client = _clients.get(uri)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(uri)
+            if client is None:
+                client = pymongo.MongoClient(
+                    uri,
+                    maxPoolSize=settings.MONGODB_MAX_POOL_SIZE,
+                    minPoolSize=settings.MONGODB_MIN_POOL_SIZE,
+                    maxIdleTimeMS=settings.MONGODB_MAX_IDLE_TIME_MS,
+                )
+                _clients[uri] = client
+    return client
+
+
 class MongoDBClient:
-    """Utility class for MongoDB operations."""
+    """Utility class for MongoDB operations.
+    
+    Uses the shared process-wide client unless one is passed in, e.g. a
+    mongomock client in tests.
+    """
     
-    def __init__(self, uri=None, db_name=None):
+    def __init__(self, uri=None, db_name=None, client=None):
         """Initialize MongoDB connection parameters."""
         self.uri = uri or settings.MONGODB_URI
-        self.db_name = db_name or self.uri.split('/')[-1]
+        self.db_name = db_name or self.uri.split('/')[-1].split('?')[0]
+        self._injected_client = client
         self.client = None
         self.db = None
     
     def connect(self):
         """Connect to MongoDB."""
         try:
-            self.client = pymongo.MongoClient(self.uri)
+            if self._injected_client is not None:
+                self.client = self._injected_client
+            else:
+                self.client = get_mongo_client(self.uri)
             self.db = self.client[self.db_name]
             logger.info(f"Connected to MongoDB database: {self.db_name}")
             return self.db
@@ -27,16 +63,15 @@ class MongoDBClient:
             raise
     
     def disconnect(self):
-        """Disconnect from MongoDB."""
-        if self.client:
-            self.client.close()
+        """Release this client's handles; the shared connection pool stays open."""
+        if self.client is not None:
             self.client = None
             self.db = None
             logger.info("Disconnected from MongoDB")
     
     def get_collection(self, collection_name):
         """Get a collection by name."""
-        if not self.db:
+        if self.db is None:
             self.connect()
         return self.db[collection_name]
     
@@ -54,8 +89,12 @@ class MongoDBClient:
     
     def find(self, collection_name, query=None, projection=None, limit=0, sort=None):
         """Find documents in a collection."""
+        return list(self.iter_find(collection_name, query, projection, limit=limit, sort=sort))
+    
+    def iter_find(self, collection_name, query=None, projection=None, limit=0, sort=None, batch_size=1000):
+        """Yield matching documents, fetching them from the server `batch_size` at a time."""
         collection = self.get_collection(collection_name)
-        cursor = collection.find(query or {}, projection)
+        cursor = collection.find(query or {}, projection).batch_size(batch_size)
         
         if sort:
             cursor = cursor.sort(sort)
@@ -63,7 +102,46 @@ class MongoDBClient:
         if limit > 0:
             cursor = cursor.limit(limit)
         
-        return list(cursor)
+        try:
+            yield from cursor
+        finally:
+            cursor.close()
+    
+    def bulk_write(self, collection_name, operations, batch_size=1000, ordered=False):
+        """Apply write operations (InsertOne, UpdateOne, DeleteMany, ...) in batches.
+        
+        `operations` may be any iterable, so it is never materialized. Writes
+        are unordered by default: a failing operation is logged and counted
+        without stopping the rest. Returns the summed result counts.
+        """
+        collection = self.get_collection(collection_name)
+        totals = {'inserted': 0, 'matched': 0, 'modified': 0, 'deleted': 0, 'upserted': 0, 'errors': 0}
+        
+        def flush(batch):
+            try:
+                result = collection.bulk_write(batch, ordered=ordered).bulk_api_result
+            except BulkWriteError as e:
+                result = e.details
+                totals['errors'] += len(result.get('writeErrors', []))
+                logger.error(f"Bulk write to {collection_name} had {len(result.get('writeErrors', []))} errors")
+                if ordered:
+                    raise
+            totals['inserted'] += result.get('nInserted', 0)
+            totals['matched'] += result.get('nMatched', 0)
+            totals['modified'] += result.get('nModified', 0)
+            totals['deleted'] += result.get('nRemoved', 0)
+            totals['upserted'] += result.get('nUpserted', 0)
+        
+        batch = []
+        for operation in operations:
+            batch.append(operation)
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+        
+        return totals
     
     def update_one(self, collection_name, filter_dict, update_dict, upsert=False):
         """Update a single document in a collection."""
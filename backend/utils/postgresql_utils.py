@@ -1,15 +1,213 @@
 # backend/utils/postgresql_utils.py
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
 import psycopg2
+import psycopg2.extensions
 import psycopg2.extras
+import psycopg2.pool
+from psycopg2 import sql
 import logging
 from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
+COPY_CHUNK_ROWS = 5000
+
+
+class ConnectionPool:
+    """Thread-safe PostgreSQL connection pool with health checks.
+
+    Wraps psycopg2's ThreadedConnectionPool. Checkouts block (up to
+    `timeout` seconds) instead of failing when every connection is in use.
+    A connection idle for longer than `health_check_interval` is pinged
+    with `SELECT 1` before it is handed out, and broken connections are
+    discarded rather than returned to the pool.
+    """
+
+    def __init__(self, connection_params, min_conn=1, max_conn=10, timeout=30, health_check_interval=30):
+        """Initialize the pool."""
+        self.connection_params = connection_params
+        self.max_conn = max_conn
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self._pool = psycopg2.pool.ThreadedConnectionPool(min_conn, max_conn, **connection_params)
+        self._slots = threading.BoundedSemaphore(max_conn)
+        self._last_used = {}
+
+    def _is_healthy(self, conn):
+        """Return whether a pooled connection is still usable."""
+        if conn.closed:
+            return False
+        if time.monotonic() - self._last_used.get(id(conn), 0) < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception as e:
+            logger.warning(f"Discarding broken PostgreSQL connection: {str(e)}")
+            return False
+
+    def getconn(self):
+        """Check out a healthy connection, waiting for a free one if necessary."""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise psycopg2.pool.PoolError(f"No PostgreSQL connection available after {self.timeout}s")
+        try:
+            # Every broken connection is discarded, so at most max_conn + 1 tries are needed
+            for _ in range(self.max_conn + 1):
+                conn = self._pool.getconn()
+                if self._is_healthy(conn):
+                    return conn
+                self._last_used.pop(id(conn), None)
+                self._pool.putconn(conn, close=True)
+            raise psycopg2.pool.PoolError("Could not obtain a healthy PostgreSQL connection")
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn):
+        """Return a connection, rolling back any open transaction first."""
+        try:
+            close = bool(conn.closed)
+            if not close and conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except Exception:
+                    close = True
+            if close:
+                self._last_used.pop(id(conn), None)
+            else:
+                self._last_used[id(conn)] = time.monotonic()
+            self._pool.putconn(conn, close=close)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """Context manager that checks out a connection and returns it afterwards."""
+        conn = self.getconn()
+        try:
+            yield conn
+        finally:
+            self.putconn(conn)
+
+    def closeall(self):
+        """Close every connection in the pool."""
+        self._pool.closeall()
+        self._last_used.clear()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_connection_pool(connection_params):
+    """Return the process-wide pool for a set of connection parameters."""
+    key = tuple(sorted((name, str(value)) for name, value in connection_params.items()))
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = ConnectionPool(
+                    connection_params,
+                    min_conn=settings.POSTGRES_POOL_MIN_CONN,
+                    max_conn=settings.POSTGRES_POOL_MAX_CONN,
+                    timeout=settings.POSTGRES_POOL_TIMEOUT,
+                    health_check_interval=settings.POSTGRES_HEALTH_CHECK_INTERVAL,
+                )
+                _pools[key] = pool
+                logger.info(f"Created PostgreSQL connection pool for {connection_params.get('database')}")
+    return pool
+
+
+def _copy_value(value):
+    """Encode one value in COPY text format."""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (datetime, date)):
+        value = value.isoformat()
+    elif isinstance(value, (dict, list)):
+        value = json.dumps(value)
+    else:
+        value = str(value)
+    return value.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def _iter_rows(rows, columns):
+    """Yield row tuples from an iterable of rows or from an Arrow RecordBatch/Table."""
+    if hasattr(rows, 'column_names'):
+        batches = rows.to_batches() if hasattr(rows, 'to_batches') else [rows]
+        for batch in batches:
+            yield from zip(*(batch.column(batch.schema.get_field_index(name)).to_pylist() for name in columns))
+    else:
+        yield from rows
+
+
+class _CopyStream:
+    """Read-only file object that encodes rows to COPY text format on demand.
+
+    `copy_expert` pulls from it in blocks, so rows are streamed to the server
+    without building the whole payload in memory.
+    """
+
+    def __init__(self, rows, chunk_rows=COPY_CHUNK_ROWS):
+        """Initialize the stream."""
+        self.rows = iter(rows)
+        self.chunk_rows = chunk_rows
+        self.buffer = ""
+        self.row_count = 0
+        self.exhausted = False
+
+    def _fill(self):
+        """Encode the next chunk of rows into the buffer."""
+        lines = []
+        for row in self.rows:
+            lines.append("\t".join(_copy_value(value) for value in row))
+            if len(lines) >= self.chunk_rows:
+                break
+        if not lines:
+            self.exhausted = True
+            return
+        self.row_count += len(lines)
+        self.buffer += "\n".join(lines) + "\n"
+
+    def read(self, size=-1):
+        """Return up to `size` characters of encoded rows."""
+        while not self.exhausted and (size < 0 or len(self.buffer) < size):
+            self._fill()
+        if size < 0:
+            size = len(self.buffer)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+    def readline(self, size=-1):
+        """Return one encoded line."""
+        while not self.exhausted and "\n" not in self.buffer:
+            self._fill()
+        end = self.buffer.find("\n") + 1 or len(self.buffer)
+        if 0 <= size < end:
+            end = size
+        data, self.buffer = self.buffer[:end], self.buffer[end:]
+        return data
+
+
 class PostgreSQLClient:
-    """Utility class for direct PostgreSQL operations."""
-    
-    def __init__(self, connection_params=None):
+    """Utility class for direct PostgreSQL operations.
+
+    Connections come from a process-wide pool shared by every client with the
+    same connection parameters; `connect` checks one out and `disconnect`
+    returns it.
+    """
+
+    def __init__(self, connection_params=None, pool=None):
         """Initialize PostgreSQL connection parameters."""
         if connection_params:
             self.connection_params = connection_params
@@ -23,72 +221,166 @@ class PostgreSQLClient:
                 'user': db_settings.get('USER', 'postgres'),
                 'password': db_settings.get('PASSWORD', 'postgres')
             }
+        self._pool = pool
         self.connection = None
-    
+
+    @property
+    def pool(self):
+        """The connection pool, created on first use."""
+        if self._pool is None:
+            self._pool = get_connection_pool(self.connection_params)
+        return self._pool
+
     def connect(self):
-        """Connect to PostgreSQL."""
+        """Check out a connection from the pool."""
         try:
-            self.connection = psycopg2.connect(**self.connection_params)
-            logger.info("Connected to PostgreSQL database")
+            if self.connection is None:
+                self.connection = self.pool.getconn()
+                logger.info("Connected to PostgreSQL database")
             return self.connection
         except Exception as e:
             logger.error(f"Error connecting to PostgreSQL: {str(e)}")
             raise
-    
+
     def disconnect(self):
-        """Disconnect from PostgreSQL."""
+        """Return the connection to the pool."""
         if self.connection:
-            self.connection.close()
+            self.pool.putconn(self.connection)
             self.connection = None
             logger.info("Disconnected from PostgreSQL database")
-    
+
+    @contextmanager
+    def pooled_connection(self):
+        """Yield the client's connection, or a pooled one for the duration of the block."""
+        if self.connection is not None:
+            yield self.connection
+        else:
+            with self.pool.connection() as conn:
+                yield conn
+
     def execute_query(self, query, params=None, fetch=True):
         """Execute a query and return results."""
-        if not self.connection:
-            self.connect()
-        
-        try:
-            with self.connection.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
-                cursor.execute(query, params)
-                
-                if fetch and cursor.description:
-                    results = cursor.fetchall()
-                    return results
-                
-                self.connection.commit()
-                return None
-                
-        except Exception as e:
-            self.connection.rollback()
-            logger.error(f"Error executing query: {str(e)}")
-            raise
-    
+        with self.pooled_connection() as conn:
+            try:
+                with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
+                    cursor.execute(query, params)
+
+                    if fetch and cursor.description:
+                        results = cursor.fetchall()
+                        conn.commit()
+                        return results
+
+                    conn.commit()
+                    return None
+
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Error executing query: {str(e)}")
+                raise
+
     def bulk_insert(self, table_name, columns, values_list, batch_size=1000):
         """Perform bulk insert operation."""
-        if not self.connection:
-            self.connect()
-        
-        try:
-            total_rows = len(values_list)
-            inserted = 0
-            
-            with self.connection.cursor() as cursor:
-                for i in range(0, total_rows, batch_size):
-                    batch = values_list[i:i+batch_size]
-                    placeholders = ','.join(['%s'] * len(batch))
-                    columns_str = ', '.join(columns)
-                    
-                    query = f"INSERT INTO {table_name} ({columns_str}) VALUES {placeholders}"
-                    cursor.execute(query, batch)
-                    
-                    inserted += len(batch)
-                    logger.info(f"Inserted {inserted}/{total_rows} rows into {table_name}")
-                
-                self.connection.commit()
-            
-            return inserted
-        
-        except Exception as e:
-            self.connection.rollback()
-            logger.error(f"Error performing bulk insert: {str(e)}")
-            raise
\ No newline at end of file
+        with self.pooled_connection() as conn:
+            try:
+                total_rows = len(values_list)
+                inserted = 0
+
+                with conn.cursor() as cursor:
+                    for i in range(0, total_rows, batch_size):
+                        batch = values_list[i:i+batch_size]
+                        placeholders = ','.join(['%s'] * len(batch))
+                        columns_str = ', '.join(columns)
+
+                        query = f"INSERT INTO {table_name} ({columns_str}) VALUES {placeholders}"
+                        cursor.execute(query, batch)
+
+                        inserted += len(batch)
+                        logger.info(f"Inserted {inserted}/{total_rows} rows into {table_name}")
+
+                    conn.commit()
+
+                return inserted
+
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Error performing bulk insert: {str(e)}")
+                raise
+
+    def _copy(self, cursor, table, columns, rows):
+        """Stream rows into `table` with COPY FROM STDIN and return the row count."""
+        statement = sql.SQL("COPY {} ({}) FROM STDIN").format(
+            table, sql.SQL(', ').join(map(sql.Identifier, columns)))
+        stream = _CopyStream(_iter_rows(rows, columns))
+        cursor.copy_expert(statement.as_string(cursor), stream)
+        return stream.row_count
+
+    def copy_rows(self, table_name, columns, rows):
+        """Bulk load rows with COPY FROM STDIN in a single transaction.
+
+        `rows` is an iterable of tuples ordered like `columns`, or a pyarrow
+        RecordBatch/Table containing those columns. Rows are encoded and sent
+        as they are consumed. Returns the number of rows loaded.
+        """
+        with self.pooled_connection() as conn:
+            try:
+                with conn.cursor() as cursor:
+                    loaded = self._copy(cursor, sql.Identifier(table_name), columns, rows)
+                conn.commit()
+                logger.info(f"Copied {loaded} rows into {table_name}")
+                return loaded
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Error copying rows into {table_name}: {str(e)}")
+                raise
+
+    def upsert_rows(self, table_name, columns, rows, conflict_columns, update_columns=None):
+        """Bulk upsert rows by COPYing them into a staging table and merging it.
+
+        The rows are loaded into a temporary table dropped at commit, then
+        inserted with `ON CONFLICT (conflict_columns) DO UPDATE` on
+        `update_columns` (all non-conflict columns by default; pass an empty
+        list to skip existing rows). Runs and commits on a pooled connection.
+        Returns the number of rows inserted or updated.
+        """
+        with self.pooled_connection() as conn:
+            try:
+                with conn.cursor() as cursor:
+                    upserted = self.upsert_rows_on_cursor(cursor, table_name, columns, rows,
+                                                          conflict_columns, update_columns)
+                conn.commit()
+                return upserted
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Error upserting rows into {table_name}: {str(e)}")
+                raise
+
+    def upsert_rows_on_cursor(self, cursor, table_name, columns, rows, conflict_columns, update_columns=None):
+        """Upsert rows like `upsert_rows` on a caller's psycopg2 cursor, without committing.
+
+        Lets the upsert join the caller's transaction, e.g. the raw cursor of
+        Django's connection inside `transaction.atomic()`.
+        """
+        if update_columns is None:
+            update_columns = [column for column in columns if column not in conflict_columns]
+
+        column_list = sql.SQL(', ').join(map(sql.Identifier, columns))
+        staging = sql.Identifier(f"{table_name}_staging")
+        if update_columns:
+            on_conflict = sql.SQL("DO UPDATE SET {}").format(sql.SQL(', ').join(
+                sql.SQL("{0} = EXCLUDED.{0}").format(sql.Identifier(column)) for column in update_columns))
+        else:
+            on_conflict = sql.SQL("DO NOTHING")
+
+        cursor.execute(sql.SQL(
+            "CREATE TEMP TABLE {} ON COMMIT DROP AS SELECT {} FROM {} WITH NO DATA"
+        ).format(staging, column_list, sql.Identifier(table_name)))
+        loaded = self._copy(cursor, staging, columns, rows)
+        cursor.execute(sql.SQL(
+            "INSERT INTO {} ({}) SELECT {} FROM {} ON CONFLICT ({}) {}"
+        ).format(sql.Identifier(table_name), column_list, column_list, staging,
+                 sql.SQL(', ').join(map(sql.Identifier, conflict_columns)), on_conflict))
+        upserted = cursor.rowcount
+        # The staging table only drops at commit, so drop it now in case the transaction upserts again
+        cursor.execute(sql.SQL("DROP TABLE {}").format(staging))
+        logger.info(f"Upserted {upserted} of {loaded} rows into {table_name}")
+        return upserted
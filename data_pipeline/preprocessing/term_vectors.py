@@ -0,0 +1,68 @@
+import json
+import os
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+import logging
+
+logger = logging.getLogger(__name__)
+
+class TermVectorBuilder:
+    """Build a sparse TF-IDF term matrix over paper abstracts.
+
+    The matrix is saved as raw CSR arrays (data, indices, indptr) plus the
+    vocabulary and the paper ids, so the backend can memory-map it without
+    scipy or pickles. Rows are ordered by paper id, making a paper's row a
+    binary search away, and each row's term indices are sorted so two rows
+    intersect with a single merge.
+    """
+
+    DATA_FILE = "data.npy"
+    INDICES_FILE = "indices.npy"
+    INDPTR_FILE = "indptr.npy"
+    VOCAB_FILE = "vocab.npy"
+    IDS_FILE = "ids.npy"
+    META_FILE = "meta.json"
+
+    def __init__(self, max_features=50000, min_df=2, max_df=0.5, ngram_range=(1, 2)):
+        """Initialize the TF-IDF vectorizer."""
+        self.vectorizer = TfidfVectorizer(
+            max_features=max_features,
+            min_df=min_df,
+            max_df=max_df,
+            ngram_range=ngram_range,
+            lowercase=True,
+            stop_words='english',
+            dtype=np.float32,
+        )
+        self.matrix = None
+        self.ids = None
+
+    def build(self, df, text_column='abstract'):
+        """Fit the vectorizer and build one L2-normalized term row per paper.
+
+        Works on the raw abstracts: the cleaned columns have their whitespace
+        stripped, which would leave one unique token per paper.
+        """
+        df = df.drop_duplicates(subset='id').sort_values('id')
+        logger.info("Building TF-IDF term matrix for %d papers", len(df))
+
+        self.matrix = self.vectorizer.fit_transform(df[text_column].fillna('')).tocsr()
+        self.matrix.sort_indices()
+        self.ids = df['id'].astype(str).to_numpy()
+
+        logger.info("Built term matrix with %d terms and %d non-zeros",
+                    self.matrix.shape[1], self.matrix.nnz)
+        return self
+
+    def save(self, directory):
+        """Save the CSR arrays, vocabulary and ids as .npy files."""
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, self.DATA_FILE), self.matrix.data.astype(np.float32))
+        np.save(os.path.join(directory, self.INDICES_FILE), self.matrix.indices.astype(np.int32))
+        np.save(os.path.join(directory, self.INDPTR_FILE), self.matrix.indptr.astype(np.int64))
+        np.save(os.path.join(directory, self.VOCAB_FILE), self.vectorizer.get_feature_names_out().astype(str))
+        np.save(os.path.join(directory, self.IDS_FILE), self.ids.astype(str))
+        with open(os.path.join(directory, self.META_FILE), 'w') as f:
+            json.dump({"papers": int(self.matrix.shape[0]), "terms": int(self.matrix.shape[1]),
+                       "nnz": int(self.matrix.nnz)}, f)
+        logger.info("Saved term matrix to %s", directory)
@@ -7,6 +7,16 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Sentence boundary: terminal punctuation followed by whitespace and an uppercase letter, digit or bracket
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+(?=[A-Z0-9(\[$\\])')
+
+# Abbreviations that end in a period without ending the sentence
+ABBREVIATIONS = ('e.g.', 'i.e.', 'et al.', 'etc.', 'cf.', 'vs.', 'Fig.', 'Eq.', 'Sec.', 'Ref.', 'approx.')
+
+def estimate_tokens(text):
+    """Estimate the number of model tokens in a text (about 4 tokens per 3 words)."""
+    return -(-len(text.split()) * 4 // 3)
+
 class TextProcessor:
     """Class for preprocessing text data for the research paper recommendation system."""
     
@@ -67,6 +77,43 @@ class TextProcessor:
         
         return df
     
+    def split_sentences(self, text, min_words=4):
+        """Split raw text into sentences, merging fragments shorter than `min_words`."""
+        if pd.isnull(text):
+            return []
+        
+        text = re.sub(r'\s+', ' ', text).strip()
+        sentences = []
+        for part in SENTENCE_BOUNDARY.split(text):
+            # Glue the part to the previous sentence after an abbreviation or a short fragment
+            if sentences and (sentences[-1].endswith(ABBREVIATIONS) or len(sentences[-1].split()) < min_words):
+                sentences[-1] = f"{sentences[-1]} {part}"
+            else:
+                sentences.append(part)
+        
+        # A trailing fragment joins the sentence before it
+        if len(sentences) > 1 and len(sentences[-1].split()) < min_words:
+            sentences[-2] = f"{sentences[-2]} {sentences.pop()}"
+        return sentences
+    
+    def build_passages(self, df, text_column='abstract'):
+        """Split each paper's text into sentence passages.
+        
+        Returns a dataframe with one row per passage: `passage_id`
+        ("<paper id>:<position>"), `paper_id`, `position`, `text` and an
+        estimated token count `n_tokens`.
+        """
+        logger.info("Splitting %d papers into passages", len(df))
+        
+        rows = []
+        for paper_id, text in zip(df['id'], df[text_column]):
+            for position, sentence in enumerate(self.split_sentences(text)):
+                rows.append((f"{paper_id}:{position}", str(paper_id), position, sentence, estimate_tokens(sentence)))
+        
+        passages = pd.DataFrame(rows, columns=['passage_id', 'paper_id', 'position', 'text', 'n_tokens'])
+        logger.info("Built %d passages", len(passages))
+        return passages
+    
     def stratify_sample(self, df, min_papers_per_category=20):
         """Create a stratified sample based on categories."""
         logger.info("Creating stratified sample with min %d papers per category", 
@@ -5,6 +5,7 @@ import os
 from sklearn.model_selection import train_test_split
 
 from preprocessing.text_processor import TextProcessor
+from preprocessing.term_vectors import TermVectorBuilder
 from embeddings.specter_embeddings import SpecterEmbeddingGenerator
 from storage.lancedb_storage import LanceDBStorage
 from data_loaders.arxiv_loader import ArxivLoader
@@ -38,6 +39,10 @@ def parse_args():
                       help="Minimum papers per category for stratified sampling")
     parser.add_argument("--batch-size", type=int, default=32,
                       help="Batch size for embedding generation")
+    parser.add_argument("--skip-passages", action="store_true",
+                      help="Do not build the sentence passage index used for RAG context")
+    parser.add_argument("--skip-term-index", action="store_true",
+                      help="Do not build the TF-IDF term matrix used for shared-term explanations")
     
     # Split options
     parser.add_argument("--train-size", type=float, default=0.7,
@@ -90,6 +95,14 @@ def main():
     val_df.to_csv(os.path.join(args.output_dir, "val_df.csv"), index=False)
     test_df.to_csv(os.path.join(args.output_dir, "test_df.csv"), index=False)
     
+    # Build the TF-IDF term matrix over every processed paper; explanations work without it
+    if not args.skip_term_index:
+        try:
+            term_builder = TermVectorBuilder().build(pd.concat([train_df, val_df, test_df]))
+            term_builder.save(os.path.join(args.output_dir, "term_index"))
+        except Exception as e:
+            logger.error("Error building the term index, continuing without it: %s", str(e))
+    
     # Initialize embedding generator
     embedding_generator = SpecterEmbeddingGenerator(batch_size=args.batch_size)
     
@@ -99,6 +112,12 @@ def main():
     # Create LanceDB table with embeddings
     lancedb_storage.create_paper_table(train_df, table_name="research_papers")
     
+    # Split abstracts into sentence passages and embed them in batches for RAG context
+    if not args.skip_passages:
+        passages_df = text_processor.build_passages(train_df)
+        passage_embeddings = embedding_generator.generate_embeddings(passages_df['text'].tolist())
+        lancedb_storage.create_passage_table(passages_df, passage_embeddings, table_name="paper_passages")
+    
     logger.info("Data processing completed successfully")
 
 if __name__ == "__main__":
@@ -55,6 +55,28 @@ class LanceDBStorage:
         logger.info("Successfully added %d papers to table %s", len(data), table_name)
         return table
     
+    def create_passage_table(self, passages_df, embeddings, table_name="paper_passages"):
+        """Create a table of sentence passages with precomputed embeddings, keyed by paper id."""
+        logger.info("Creating table %s with %d passages", table_name, len(passages_df))
+        
+        data = [
+            {
+                "passage_id": row.passage_id,
+                "paper_id": row.paper_id,
+                "position": int(row.position),
+                "text": row.text,
+                "n_tokens": int(row.n_tokens),
+                "embedding": embedding.astype("float32").tolist(),
+            }
+            for row, embedding in zip(passages_df.itertuples(index=False), embeddings)
+        ]
+        
+        # Create the table (overwrite if it exists)
+        table = self.db.create_table(table_name, data=data, mode="overwrite")
+        
+        logger.info("Successfully added %d passages to table %s", len(data), table_name)
+        return table
+    
     def get_similar_papers(self, query_embedding, table_name="research_papers", k=10):
         """Get similar papers based on embedding similarity."""
         table = self.db.open_table(table_name)
@@ -3,6 +3,8 @@ import axios from 'axios';
 // Create an Axios instance with base URL from environment
 const api = axios.create({
   baseURL: process.env.NEXT_PUBLIC_API_URL,
+  // Send the browsing session cookie so views and searches are grouped per visitor
+  withCredentials: true,
   headers: {
     'Content-Type': 'application/json',
   },